@@ -0,0 +1,355 @@
+"""
+Компактный бинарный экспорт селекторов, цветов и дерева (с чтением через mmap)
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from TreeBuilder import HASH_SIZE, SelectorTrie
+
+MAGIC = b'SCLRBIN\x00'
+FORMAT_VERSION = 1
+
+# Заголовок: сигнатура, версия, порядок байт (1 - little, 2 - big), число секций
+HEADER = struct.Struct('<8sHHI')
+# Секция: имя, код типа (как в array/memoryview), смещение, количество элементов
+SECTION = struct.Struct('<8s1s7xQQ')
+ALIGN = 8
+
+BYTE_ORDER = 1 if sys.byteorder == 'little' else 2
+EMPTY = -1
+
+
+def _hash(name):
+    """Хэш имени для таблицы поиска (одинаковый у записи и чтения)"""
+    return zlib.crc32(name)
+
+
+class BinaryExport:
+    """
+    Запись файла экспорта
+
+    Формат (версия FORMAT_VERSION): заголовок, каталог секций и секции,
+    выровненные по 8 байт. Секции - плоские массивы одного типа:
+
+        strings   B  UTF-8 всех строк подряд
+        str_offs  I  смещения строк (строк + 1)
+        sel_name  i  индекс строки селектора ('#id' или '.class')
+        sel_rgb   B  цвета селекторов, по 3 байта
+        sel_hash  i  открытая адресация: индекс селектора или -1
+        node_nm   i  индекс строки компонента узла дерева
+        parent    i  родитель узла (-1 у корня)
+        first_ch  i  первый ребёнок (дети упорядочены по имени)
+        next_sib  i  следующий брат
+        depth     i  глубина узла
+        sub_size  i  размер поддерева узла (SelectorTrie.index)
+        occ_offs  I  по индексу строки - начало её узлов в occ_node (строк + 1)
+        occ_node  i  узлы каждого компонента (инвертированный индекс)
+        str_hash  i  открытая адресация: индекс строки или -1
+        sub_hash  B  хэши поддеревьев, по HASH_SIZE байт (SelectorTrie.subtree_hashes)
+
+    Узел 0 - виртуальный корень, как в SelectorTrie. Селекторы и компоненты
+    дерева используют одну таблицу строк, так что у совпадающих имён
+    один индекс. Новые секции можно добавлять без смены версии -
+    читатель находит секции по имени.
+    """
+
+    @staticmethod
+    def _string_table(strings):
+        """(строки в bytes, смещения, индекс строки по имени)"""
+        index = {}
+        blob = bytearray()
+        offsets = array('I', [0])
+        for s in strings:
+            if s in index:
+                continue
+            index[s] = len(index)
+            blob += s.encode('utf-8')
+            offsets.append(len(blob))
+        return bytes(blob), offsets, index
+
+    @staticmethod
+    def _hash_table(names):
+        """Таблица открытой адресации (линейное пробирование) на не меньше 2n слотов"""
+        size = 1
+        while size < 2 * len(names):
+            size <<= 1
+        slots = array('i', [EMPTY]) * size
+        mask = size - 1
+        for i, name in enumerate(names):
+            slot = _hash(name) & mask
+            while slots[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            slots[slot] = i
+        return slots
+
+    @staticmethod
+    def sections(pairs, trie=None):
+        """
+        Секции экспорта: {имя: (код типа, данные)}
+
+        pairs - пары (селектор с префиксом, (r, g, b)),
+        trie - SelectorTrie или None
+        """
+        pairs = list(pairs)
+        selectors = [selector for selector, _ in pairs]
+        tree_names = trie.names if trie is not None else []
+        blob, offsets, index = BinaryExport._string_table(selectors + tree_names)
+
+        sections = {
+            'strings': ('B', blob),
+            'str_offs': ('I', offsets),
+            'sel_name': ('i', array('i', (index[s] for s in selectors))),
+            'sel_rgb': ('B', bytes(int(c) for _, rgb in pairs for c in rgb)),
+            'sel_hash': ('i', BinaryExport._hash_table([s.encode('utf-8') for s in selectors])),
+        }
+
+        if trie is not None:
+            first_child, next_sibling = trie.sibling_links()
+            occurrences, subtree = trie.index()
+            remap = array('i', (index[name] for name in trie.names))
+
+            # Инвертированный индекс в виде CSR по индексам строк
+            by_string = {remap[name_id]: nodes for name_id, nodes in occurrences.items()}
+            occ_offs = array('I', [0])
+            occ_node = array('i')
+            for string_id in range(len(index)):
+                occ_node.extend(by_string.get(string_id, ()))
+                occ_offs.append(len(occ_node))
+
+            sections.update({
+                'node_nm': ('i', array('i', (remap[i] if i >= 0 else EMPTY for i in trie.node_name))),
+                'parent': ('i', trie.parent),
+                'first_ch': ('i', first_child),
+                'next_sib': ('i', next_sibling),
+                'depth': ('i', trie.depth),
+                'sub_size': ('i', subtree),
+                'occ_offs': ('I', occ_offs),
+                'occ_node': ('i', occ_node),
+                'str_hash': ('i', BinaryExport._hash_table([s.encode('utf-8') for s in index])),
+                'sub_hash': ('B', b''.join(trie.subtree_hashes())),
+            })
+        return sections
+
+    @staticmethod
+    def write_sections(path, sections):
+        """Записывает секции в файл (атомарно, через временный файл)"""
+        directory = []
+        offset = HEADER.size + SECTION.size * len(sections)
+        for name, (code, data) in sections.items():
+            if len(name) > 8:
+                raise ValueError(f"Имя секции длиннее 8 символов: '{name}'")
+            offset = -(-offset // ALIGN) * ALIGN
+            itemsize = struct.calcsize(code)
+            size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+            directory.append((name, code, offset, size // itemsize, data))
+            offset += size
+
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, len(directory)))
+            for name, code, offset, count, _ in directory:
+                f.write(SECTION.pack(name.encode('ascii'), code.encode('ascii'), offset, count))
+            for _, _, offset, _, data in directory:
+                f.write(b'\x00' * (offset - f.tell()))
+                f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def write(path, pairs, trie=None):
+        """Экспорт пар (селектор с префиксом, цвет) и дерева в path"""
+        return BinaryExport.write_sections(path, BinaryExport.sections(pairs, trie))
+
+    @staticmethod
+    def write_tree(path, trie):
+        """Экспорт только дерева с индексом (без цветов)"""
+        return BinaryExport.write(path, (), trie)
+
+
+class BinaryReader:
+    """
+    Чтение экспорта через mmap без копирования и разбора
+
+    Секции доступны как memoryview нужного типа (section), поиск цвета
+    селектора - O(1) по хэш-таблице, дерево - через массивы parent,
+    first_child и next_sibling. Если в файле есть индекс дерева, вхождения
+    компонента (find) и размеры поддеревьев (subtree_size) отвечаются
+    без обхода, как у SelectorTrie.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+
+        magic, version, byte_order, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Не файл экспорта ScreenColorizer: {path}")
+        if version > FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Версия формата {version} новее поддерживаемой {FORMAT_VERSION}")
+        if byte_order != BYTE_ORDER:
+            self.close()
+            raise ValueError("Файл записан с другим порядком байт")
+        self.version = version
+
+        self._sections = {}
+        for i in range(count):
+            name, code, offset, items = SECTION.unpack_from(self._mm, HEADER.size + i * SECTION.size)
+            self._sections[name.rstrip(b'\x00').decode('ascii')] = (code.decode('ascii'), offset, items)
+
+        self.strings = self.section('strings')
+        self.str_offs = self.section('str_offs')
+        self.sel_name = self.section('sel_name')
+        self.sel_rgb = self.section('sel_rgb')
+        self.sel_hash = self.section('sel_hash')
+
+        self.has_tree = 'parent' in self._sections
+        if self.has_tree:
+            self.node_name = self.section('node_nm')
+            self.parent = self.section('parent')
+            self.first_child = self.section('first_ch')
+            self.next_sibling = self.section('next_sib')
+            self.depth = self.section('depth')
+
+        self.has_index = 'occ_node' in self._sections
+        if self.has_index:
+            self.sub_size = self.section('sub_size')
+            self.occ_offs = self.section('occ_offs')
+            self.occ_node = self.section('occ_node')
+            self.str_hash = self.section('str_hash')
+
+        self.has_hashes = 'sub_hash' in self._sections
+        if self.has_hashes:
+            self.sub_hash = self.section('sub_hash')
+
+    def section(self, name):
+        """memoryview секции (без копирования)"""
+        code, offset, items = self._sections[name]
+        view = memoryview(self._mm)[offset:offset + items * struct.calcsize(code)].cast(code)
+        self._views.append(view)
+        return view
+
+    def string(self, index):
+        return str(self.strings[self.str_offs[index]:self.str_offs[index + 1]], 'utf-8')
+
+    def _string_equals(self, index, raw):
+        start, end = self.str_offs[index], self.str_offs[index + 1]
+        return end - start == len(raw) and self.strings[start:end] == raw
+
+    def __len__(self):
+        """Количество селекторов"""
+        return len(self.sel_name)
+
+    def selector(self, i):
+        return self.string(self.sel_name[i])
+
+    def color(self, i):
+        return tuple(self.sel_rgb[3 * i:3 * i + 3])
+
+    def _probe(self, slots, strings, raw):
+        """Поиск в таблице открытой адресации: элемент, чья строка равна raw, или -1"""
+        mask = len(slots) - 1
+        slot = _hash(raw) & mask
+        while True:
+            i = slots[slot]
+            if i == EMPTY or self._string_equals(strings[i], raw):
+                return i
+            slot = (slot + 1) & mask
+
+    def selector_index(self, selector):
+        """Индекс селектора ('#id' или '.class') или -1"""
+        return self._probe(self.sel_hash, self.sel_name, selector.encode('utf-8'))
+
+    def lookup(self, selector):
+        """Цвет селектора (r, g, b) или None"""
+        i = self.selector_index(selector)
+        return None if i == EMPTY else self.color(i)
+
+    def string_index(self, name):
+        """Индекс строки в таблице или -1 (нужен индекс дерева)"""
+        return self._probe(self.str_hash, range(len(self.str_offs) - 1), name.encode('utf-8'))
+
+    def find(self, name):
+        """Узлы компонента name (например, '#logo') в порядке добавления"""
+        string_id = self.string_index(name)
+        if string_id == EMPTY:
+            return []
+        return self.occ_node[self.occ_offs[string_id]:self.occ_offs[string_id + 1]].tolist()
+
+    def subtree_size(self, node):
+        """Количество узлов в поддереве (включая сам узел)"""
+        return self.sub_size[node]
+
+    def subtree_hash(self, node):
+        """Хэш поддерева (как SelectorTrie.subtree_hash)"""
+        return bytes(self.sub_hash[node * HASH_SIZE:(node + 1) * HASH_SIZE])
+
+    def ancestors(self, node):
+        """Предки узла от родителя к корневому элементу"""
+        result = []
+        node = self.parent[node]
+        while node > SelectorTrie.ROOT:
+            result.append(node)
+            node = self.parent[node]
+        return result
+
+    def items(self):
+        """Пары (селектор, цвет) в порядке записи"""
+        for i in range(len(self)):
+            yield self.selector(i), self.color(i)
+
+    def node_count(self):
+        """Количество узлов дерева без виртуального корня"""
+        return len(self.parent) - 1 if self.has_tree else 0
+
+    def name(self, node):
+        return self.string(self.node_name[node])
+
+    def children(self, node=SelectorTrie.ROOT):
+        """Дети узла по порядку имён"""
+        child = self.first_child[node]
+        while child != EMPTY:
+            yield child
+            child = self.next_sibling[child]
+
+    def find_path(self, components):
+        """Узел пути из компонентов или -1"""
+        node = SelectorTrie.ROOT
+        for comp in components:
+            node = next((child for child in self.children(node) if self.name(child) == comp), EMPTY)
+            if node == EMPTY:
+                break
+        return node
+
+    def path(self, node):
+        """Компоненты пути от корня до узла"""
+        components = []
+        while node > SelectorTrie.ROOT:
+            components.append(self.name(node))
+            node = self.parent[node]
+        return components[::-1]
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
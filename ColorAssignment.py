@@ -0,0 +1,139 @@
+"""
+Стабильное назначение цветов селекторам между запусками
+"""
+import json
+import os
+
+
+class ColorAssignment:
+    """
+    Сохранённое соответствие селектор -> цвет
+
+    Состояние хранится в JSON: метод и его параметры, отпечатки входных
+    файлов (размер, mtime) и цвета по типам селекторов. Уже известные
+    селекторы сохраняют цвет, новые получают цвета, максимально отличные
+    от занятых. При смене метода или его параметров состояние сбрасывается.
+    """
+
+    def __init__(self, state_file, method_key, method):
+        self.state_file = state_file
+        self.method_key = method_key
+        self.method = method
+        self.inputs = {}
+        self.colors = {}
+        self.new_count = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_file):
+            return
+
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        if state.get('method') != self.method_key or state.get('params') != self.method.params:
+            return
+
+        self.inputs = state.get('inputs', {})
+        self.colors = {
+            selector_type: {name: tuple(rgb) for name, rgb in colors.items()}
+            for selector_type, colors in state.get('colors', {}).items()
+        }
+
+    @staticmethod
+    def fingerprint(files):
+        """Отпечатки входных файлов: {путь: [размер, mtime_ns]}"""
+        result = {}
+        for path in files:
+            st = os.stat(path)
+            result[path] = [st.st_size, st.st_mtime_ns]
+        return result
+
+    def inputs_unchanged(self, files):
+        """Вход не изменился с прошлого запуска"""
+        return bool(self.inputs) and self.inputs == self.fingerprint(files)
+
+    def assign(self, selector_type, selectors, cache=None):
+        """
+        Цвета для selectors (в том же порядке)
+
+        Известные селекторы сохраняют цвет. Удалённые выбывают из состояния.
+        Новые дополняют занятые цвета: FPS продолжается от уже выбранных,
+        а методы без продолжения генерируются заново с пропуском занятых
+        (см. _unused_colors).
+        """
+        known = self.colors.get(selector_type, {})
+        kept = {name: known[name] for name in selectors if name in known}
+        new = [name for name in selectors if name not in known]
+
+        if new:
+            used = list(kept.values())
+            if not used:
+                if cache:
+                    fresh = cache.get_or_generate(self.method, len(new))
+                else:
+                    fresh = self.method.generate(len(new))
+            else:
+                fresh = self._unused_colors(used, len(new))
+            kept.update(zip(new, (tuple(int(c) for c in rgb) for rgb in fresh)))
+            self.new_count += len(new)
+
+        self.colors[selector_type] = kept
+        return [kept[name] for name in selectors]
+
+    def known_colors(self, selector_type, selectors):
+        """Цвета из состояния, если оно хранит ровно эти селекторы, иначе None"""
+        known = self.colors.get(selector_type, {})
+        if len(known) != len(selectors) or any(name not in known for name in selectors):
+            return None
+        return [known[name] for name in selectors]
+
+    def _unused_colors(self, used, n):
+        """
+        n различных цветов, не совпадающих с занятыми
+
+        Методы с продолжением (FPS) дополняют занятые цвета. Остальные
+        генерируют палитру на len(used) + n цветов и увеличивают её,
+        пока свободных не хватит; если метод перестал давать новые цвета
+        (повторяющаяся палитра), выбрасывается ValueError
+        """
+        if self.method.can_extend:
+            return self.method.extend(used, n)
+
+        taken = set(used)
+        size = len(used) + n
+        distinct = 0
+        while True:
+            # Часть методов принимает только чётное n
+            size += size % 2
+            palette = dict.fromkeys(tuple(int(c) for c in rgb) for rgb in self.method.generate(size))
+            fresh = [rgb for rgb in palette if rgb not in taken]
+            if len(fresh) >= n:
+                return fresh[:n]
+            if len(palette) <= distinct:
+                raise ValueError(
+                    f"Метод '{self.method_key}' даёт только {len(fresh)} свободных цветов, а нужно {n}"
+                )
+            distinct = len(palette)
+            size *= 2
+
+    def save(self, files):
+        """Сохранить состояние вместе с отпечатками входа"""
+        state = {
+            'method': self.method_key,
+            'params': self.method.params,
+            'inputs': self.fingerprint(files),
+            'colors': {
+                selector_type: {name: list(rgb) for name, rgb in colors.items()}
+                for selector_type, colors in self.colors.items()
+            },
+        }
+
+        output_dir = os.path.dirname(self.state_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_file)
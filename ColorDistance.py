@@ -0,0 +1,182 @@
+"""
+Векторные перцептивные расстояния (CIE76, CIEDE2000, OKLab) и оценка палитр
+"""
+import numpy as np
+
+from ColorSpace import ColorSpace
+
+
+class ColorDistance:
+    """
+    Ядра расстояний работают с массивами (..., 3) и broadcasting:
+    пара (N, 3) и (3,) даёт расстояния от N точек до одной,
+    (N, 1, 3) и (1, M, 3) - матрицу N x M.
+    """
+
+    BLOCK_SIZE = 1024
+
+    @staticmethod
+    def cie76(lab1, lab2):
+        """ΔE CIE76 - евклидово расстояние в CIE Lab"""
+        diff = np.asarray(lab1, dtype=np.float64) - np.asarray(lab2, dtype=np.float64)
+        return np.sqrt((diff ** 2).sum(axis=-1))
+
+    @staticmethod
+    def oklab(ok1, ok2):
+        """ΔE OKLab - евклидово расстояние в OKLab"""
+        return ColorDistance.cie76(ok1, ok2)
+
+    @staticmethod
+    def ciede2000(lab1, lab2):
+        """ΔE CIEDE2000 (kL = kC = kH = 1) между цветами CIE Lab"""
+        lab1 = np.asarray(lab1, dtype=np.float64)
+        lab2 = np.asarray(lab2, dtype=np.float64)
+        L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+        L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+        c_mean7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2) ** 7
+        g = 0.5 * (1 - np.sqrt(c_mean7 / (c_mean7 + 25.0 ** 7)))
+        a1p = (1 + g) * a1
+        a2p = (1 + g) * a2
+        c1p = np.hypot(a1p, b1)
+        c2p = np.hypot(a2p, b2)
+        h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+        h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+        chroma_zero = (c1p * c2p) == 0
+        dhp = h2p - h1p
+        dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+        dhp = np.where(chroma_zero, 0.0, dhp)
+
+        dLp = L2 - L1
+        dCp = c2p - c1p
+        dHp = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dhp) / 2)
+
+        lp_mean = (L1 + L2) / 2
+        cp_mean = (c1p + c2p) / 2
+        h_sum = h1p + h2p
+        hp_mean = np.where(
+            np.abs(h1p - h2p) <= 180, h_sum / 2,
+            np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2)
+        )
+        hp_mean = np.where(chroma_zero, h_sum, hp_mean)
+
+        t = (1 - 0.17 * np.cos(np.radians(hp_mean - 30))
+             + 0.24 * np.cos(np.radians(2 * hp_mean))
+             + 0.32 * np.cos(np.radians(3 * hp_mean + 6))
+             - 0.20 * np.cos(np.radians(4 * hp_mean - 63)))
+        d_theta = 30 * np.exp(-((hp_mean - 275) / 25) ** 2)
+        cp_mean7 = cp_mean ** 7
+        rc = 2 * np.sqrt(cp_mean7 / (cp_mean7 + 25.0 ** 7))
+        sl = 1 + 0.015 * (lp_mean - 50) ** 2 / np.sqrt(20 + (lp_mean - 50) ** 2)
+        sc = 1 + 0.045 * cp_mean
+        sh = 1 + 0.015 * cp_mean * t
+        rt = -np.sin(np.radians(2 * d_theta)) * rc
+
+        dl = dLp / sl
+        dc = dCp / sc
+        dh = dHp / sh
+        return np.sqrt(np.maximum(dl ** 2 + dc ** 2 + dh ** 2 + rt * dc * dh, 0.0))
+
+    # Метрика -> (конвертация из RGB, ядро расстояния)
+    METRICS = {
+        'cie76': (ColorSpace.rgb_to_lab, cie76),
+        'ciede2000': (ColorSpace.rgb_to_lab, ciede2000),
+        'oklab': (ColorSpace.rgb_to_oklab, oklab),
+    }
+
+    @staticmethod
+    def _metric(metric):
+        if metric not in ColorDistance.METRICS:
+            raise ValueError(f"Неизвестная метрика '{metric}'")
+        convert, kernel = ColorDistance.METRICS[metric]
+        return convert, kernel.__func__
+
+    @staticmethod
+    def kernel(metric):
+        """Функция расстояния метрики (для генераторов и FPS)"""
+        return ColorDistance._metric(metric)[1]
+
+    @staticmethod
+    def from_rgb(rgb, metric):
+        """Координаты цветов RGB в пространстве метрики"""
+        convert, _ = ColorDistance._metric(metric)
+        return convert(np.asarray(rgb))
+
+    @staticmethod
+    def iter_pairwise_blocks(points_a, points_b=None, metric='cie76', block_size=None):
+        """
+        Блоки матрицы попарных расстояний: (i0, j0, блок)
+
+        Точки уже в пространстве метрики. В памяти одновременно
+        не больше block_size x block_size расстояний.
+        """
+        _, kernel = ColorDistance._metric(metric)
+        block_size = block_size or ColorDistance.BLOCK_SIZE
+        points_a = np.asarray(points_a, dtype=np.float64)
+        points_b = points_a if points_b is None else np.asarray(points_b, dtype=np.float64)
+
+        for i0 in range(0, len(points_a), block_size):
+            block_a = points_a[i0:i0 + block_size, None, :]
+            for j0 in range(0, len(points_b), block_size):
+                yield i0, j0, kernel(block_a, points_b[None, j0:j0 + block_size, :])
+
+    @staticmethod
+    def point_to_set(points, reference, metric='cie76', block_size=None):
+        """Минимальное расстояние от каждой точки до множества reference (блоками)"""
+        points = np.asarray(points, dtype=np.float64)
+        result = np.full(len(points), np.inf)
+        if len(reference) == 0:
+            return result
+
+        for i0, _, block in ColorDistance.iter_pairwise_blocks(points, reference, metric, block_size):
+            np.minimum(result[i0:i0 + len(block)], block.min(axis=1), out=result[i0:i0 + len(block)])
+        return result
+
+    @staticmethod
+    def nearest_neighbours(points, metric='cie76', block_size=None):
+        """Для каждой точки: расстояние до ближайшей другой точки и её индекс"""
+        points = np.asarray(points, dtype=np.float64)
+        distance = np.full(len(points), np.inf)
+        index = np.full(len(points), -1, dtype=np.intp)
+
+        for i0, j0, block in ColorDistance.iter_pairwise_blocks(points, None, metric, block_size):
+            if i0 == j0:
+                np.fill_diagonal(block, np.inf)
+            best = block.argmin(axis=1)
+            best_dist = block[np.arange(len(block)), best]
+            rows = slice(i0, i0 + len(block))
+            closer = best_dist < distance[rows]
+            distance[rows] = np.where(closer, best_dist, distance[rows])
+            index[rows] = np.where(closer, best + j0, index[rows])
+
+        return distance, index
+
+    @staticmethod
+    def palette_report(colors, metric='ciede2000', worst=5):
+        """
+        Качество палитры RGB: минимальное и среднее расстояние до ближайшего
+        соседа и самые близкие пары цветов
+        """
+        colors = np.asarray(colors, dtype=np.int64).reshape(-1, 3)
+        report = {'count': len(colors), 'metric': metric, 'min': None, 'mean_nn': None, 'worst_pairs': []}
+        if len(colors) < 2:
+            return report
+
+        distance, index = ColorDistance.nearest_neighbours(ColorDistance.from_rgb(colors, metric), metric)
+
+        pairs = {}
+        for i in np.argsort(distance, kind='stable'):
+            pair = tuple(sorted((int(i), int(index[i]))))
+            pairs.setdefault(pair, float(distance[i]))
+            if len(pairs) >= worst:
+                break
+
+        report['min'] = float(distance.min())
+        report['mean_nn'] = float(distance.mean())
+        report['worst_pairs'] = [
+            {'i': i, 'j': j, 'distance': d,
+             'rgb_i': tuple(int(c) for c in colors[i]), 'rgb_j': tuple(int(c) for c in colors[j])}
+            for (i, j), d in pairs.items()
+        ]
+        return report
@@ -1,8 +1,16 @@
 import colorsys
 import math
-import random
-import matplotlib.pyplot as plt
 import numpy as np
+from ColorSpace import ColorSpace
+from ColorSampler import ColorSampler
+from ColorDistance import ColorDistance
+from Metrics import Metrics
+
+# Сеточный FPS обгоняет обычный только на больших наборах кандидатов
+GRID_FPS_MIN_CANDIDATES = 200000
+
+# Предел автоматического увеличения выборки (порядка всего куба RGB)
+MAX_SAMPLES = 1 << 25
 
 
 class ColorGenerator:
@@ -73,6 +81,9 @@ class ColorGenerator:
         if n % 2 != 0:
             raise ValueError("Количество цветов должно быть чётным")
 
+        # matplotlib тяжёлый - импортируем только для этого метода
+        import matplotlib.pyplot as plt
+
         cmap = plt.get_cmap('tab20')
         indices = np.linspace(0, 1, n)
         colors_rgba = cmap(indices)
@@ -89,48 +100,60 @@ class ColorGenerator:
     @staticmethod
     def rgb_to_lab(r, g, b):
         """Конвертация RGB -> Lab (CIE Lab)"""
-        r, g, b = [x / 255.0 for x in (r, g, b)]
-        r = ((r + 0.055) / 1.055) ** 2.4 if r > 0.04045 else r / 12.92
-        g = ((g + 0.055) / 1.055) ** 2.4 if g > 0.04045 else g / 12.92
-        b = ((b + 0.055) / 1.055) ** 2.4 if b > 0.04045 else b / 12.92
-        x = r * 0.4124 + g * 0.3576 + b * 0.1805
-        y = r * 0.2126 + g * 0.7152 + b * 0.0722
-        z = r * 0.0193 + g * 0.1192 + b * 0.9505
-        x, y, z = [v / ref for v, ref in zip((x, y, z), (0.95047, 1.0, 1.08883))]
-        x = x ** (1 / 3) if x > 0.008856 else 7.787 * x + 16 / 116
-        y = y ** (1 / 3) if y > 0.008856 else 7.787 * y + 16 / 116
-        z = z ** (1 / 3) if z > 0.008856 else 7.787 * z + 16 / 116
-        return (116 * y - 16, 500 * (x - y), 200 * (y - z))
+        return tuple(float(v) for v in ColorSpace.rgb_to_lab((r, g, b)))
 
     @staticmethod
     def delta_e(lab1, lab2):
         """Расстояние между цветами в Lab (CIE76)"""
-        return math.sqrt(sum((a - b) ** 2 for a, b in zip(lab1, lab2)))
+        return float(ColorDistance.cie76(lab1, lab2))
 
     @staticmethod
-    def generate_distinct_lab_colors(n, skip=16):
-        """Генерация максимально различимых цветов в Lab пространстве"""
-        if n % 2 != 0:
-            raise ValueError("Количество цветов должно быть чётным")
+    def _lab_grid(skip, chunk_size=1 << 20):
+        """
+        Lab-таблица RGB-сетки с шагом skip - массив (N, 3) float32
+
+        Порядок точек совпадает с вложенными циклами r -> g -> b.
+        Конвертация идёт блоками, поэтому даже полная сетка 256³ не требует
+        промежуточных массивов float64 на все точки сразу.
+        """
+        values = np.arange(0, 256, skip)
+        m = len(values)
+        total = m ** 3
+
+        lab = np.empty((total, 3), dtype=np.float32)
+        for start in range(0, total, chunk_size):
+            idx = np.arange(start, min(start + chunk_size, total))
+            rgb = np.stack([values[idx // (m * m)], values[idx // m % m], values[idx % m]], axis=1)
+            lab[start:start + len(idx)] = ColorSpace.rgb_to_lab(rgb)
 
-        colors = [[0, 0, 0]]
-        for _ in range(n - 1):
-            max_dist = -math.inf
-            best_color = None
-            for r in range(0, 256, skip):
-                for g in range(0, 256, skip):
-                    for b in range(0, 256, skip):
-                        candidate = [r, g, b]
-                        lab_cand = ColorGenerator.rgb_to_lab(*candidate)
-                        min_dist = min(ColorGenerator.delta_e(lab_cand, ColorGenerator.rgb_to_lab(*c)) for c in colors)
-                        if min_dist > max_dist:
-                            max_dist = min_dist
-                            best_color = candidate
-            if best_color:
-                colors.append(best_color)
+        return values, lab
+
+    @staticmethod
+    def generate_distinct_lab_colors(n, skip=16, metric='cie76'):
+        """
+        Генерация максимально различимых цветов в Lab пространстве
+
+        Lab-таблица сетки кандидатов строится один раз, дальше работает
+        Farthest-Point Sampling с поддержкой минимальных расстояний,
+        так что мелкие сетки (skip=4 или даже skip=1) тоже практичны.
+        metric - 'cie76' или 'ciede2000' (медленнее, точнее для глаза)
+        """
+        # Кандидаты - в CIE Lab, метрики других пространств к ним неприменимы
+        if metric not in ('cie76', 'ciede2000'):
+            raise ValueError(f"Метрика '{metric}' не подходит для Lab: нужна 'cie76' или 'ciede2000'")
+        if n <= 0:
+            return []
+
+        values, lab = ColorGenerator._lab_grid(skip)
+        m = len(values)
+
+        # Первый цвет - чёрный (индекс 0 сетки)
+        distance = ColorDistance.kernel(metric) if metric != 'cie76' else None
+        selected = ColorGenerator.farthest_point_sampling(lab, n, first_index=0, distance=distance)
+        colors = [[int(values[i // (m * m)]), int(values[i // m % m]), int(values[i % m])] for i in selected]
 
         half = n // 2
-        for i in range(half, n):
+        for i in range(half, len(colors)):
             colors[i] = [int(c * 0.5) for c in colors[i]]
 
         return [tuple(c) for c in colors]
@@ -138,77 +161,113 @@ class ColorGenerator:
     @staticmethod
     def rgb_to_oklab(r, g, b):
         """Конвертация RGB -> OKLab (перцептивно равномерное цветовое пространство)"""
+        return ColorSpace.rgb_to_oklab((r, g, b))  # [L, a, b]
 
-        def rgb_to_linear(v):
-            v = v / 255.0
-            if v > 0.04045:
-                return ((v + 0.055) / 1.055) ** 2.4
-            else:
-                return v / 12.92
+    @staticmethod
+    def oklab_to_rgb(L, a, b):
+        """Конвертация OKLab -> RGB"""
+        return tuple(int(c) for c in ColorSpace.oklab_to_rgb((L, a, b)))
 
-        lin_r = rgb_to_linear(r)
-        lin_g = rgb_to_linear(g)
-        lin_b = rgb_to_linear(b)
+    @staticmethod
+    def farthest_point_sampling(points, n, first_index=0, initial=None, distance=None):
+        """
+        Farthest-Point Sampling по массиву точек (N, 3)
 
-        M1 = np.array([
-            [0.4122214708, 0.5363325363, 0.0514459929],
-            [0.2119034982, 0.6806995451, 0.1073969566],
-            [0.0883024619, 0.2817188376, 0.6299787005]
-        ])
+        Хранит для каждого кандидата минимальное расстояние до уже выбранных
+        точек и обновляет его один раз на каждый выбор: O(n * N) векторных
+        операций вместо O(n² * N) интерпретируемых.
 
-        lms = M1 @ np.array([lin_r, lin_g, lin_b])
-        lms_prime = np.cbrt(lms)
+        initial - уже выбранные точки (M, 3): выборка продолжается от них,
+        а first_index не используется.
 
-        M2 = np.array([
-            [0.2104542553, 0.7936177850, -0.0040720468],
-            [1.9779984951, -2.4285922050, 0.4505937099],
-            [0.0259040371, 0.7827717662, -0.8086757667]
-        ])
+        distance - ядро расстояния из ColorDistance (по умолчанию евклидово)
 
-        oklab = M2 @ lms_prime
-        return oklab  # [L, a, b]
+        Возвращает: массив индексов выбранных точек (в порядке выбора)
+        """
+        # Покоординатные непрерывные массивы float32 и квадраты расстояний:
+        # на порядок меньше памяти и работы, чем norm() по (N, 3)
+        points = np.asarray(points)
+        if points.dtype.kind != 'f':
+            points = points.astype(float)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError(f"Ожидается массив точек (N, 3), получен {points.shape}")
+        columns = [np.ascontiguousarray(points[:, k], dtype=np.float32) for k in range(3)]
+
+        size = len(columns[0])
+        count = min(n, size)
+        if count <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        min_dist = np.full(size, np.inf, dtype=np.float32)
+        dist = np.empty_like(min_dist)
+        diff = np.empty_like(min_dist)
+
+        stacked = np.asarray(points, dtype=np.float32) if distance is not None else None
+
+        def update(point):
+            if distance is not None:
+                np.minimum(min_dist, distance(stacked, np.asarray(point, dtype=np.float64)), out=min_dist)
+                return
+            np.subtract(columns[0], point[0], out=dist)
+            np.multiply(dist, dist, out=dist)
+            for k in (1, 2):
+                np.subtract(columns[k], point[k], out=diff)
+                np.multiply(diff, diff, out=diff)
+                np.add(dist, diff, out=dist)
+            np.minimum(min_dist, dist, out=min_dist)
+
+        best_index = first_index
+        if initial is not None and len(initial):
+            for point in np.asarray(initial, dtype=np.float32):
+                update(point)
+            best_index = int(np.argmax(min_dist))
+
+        selected = np.empty(count, dtype=np.intp)
+
+        for iteration in range(count):
+            selected[iteration] = best_index
+
+            update([column[best_index] for column in columns])
+            min_dist[best_index] = -1.0
+
+            best_index = int(np.argmax(min_dist))
+
+        return selected
 
     @staticmethod
-    def oklab_to_rgb(L, a, b):
-        """Конвертация OKLab -> RGB"""
+    def _unique_count(rgb_points):
+        """Число различных цветов RGB"""
+        packed = np.asarray(rgb_points, dtype=np.int64) @ np.array([1 << 16, 1 << 8, 1])
+        return len(np.unique(packed))
 
-        def linear_to_rgb(v):
-            if v > 0.0031308:
-                return 1.055 * (v ** (1 / 2.4)) - 0.055
-            else:
-                return 12.92 * v
-
-        M2 = np.array([
-            [0.2104542553, 0.7936177850, -0.0040720468],
-            [1.9779984951, -2.4285922050, 0.4505937099],
-            [0.0259040371, 0.7827717662, -0.8086757667]
-        ])
-        M2_inv = np.linalg.inv(M2)
-
-        lms_prime = M2_inv @ np.array([L, a, b])
-        lms = lms_prime ** 3
+    @staticmethod
+    def _sample_fps_candidates(num_samples, seed=None, sampling='random', required=0):
+        """
+        Кандидаты для FPS (без слишком тёмных) и их OKLab - см. ColorSampler
 
-        M1 = np.array([
-            [0.4122214708, 0.5363325363, 0.0514459929],
-            [0.2119034982, 0.6806995451, 0.1073969566],
-            [0.0883024619, 0.2817188376, 0.6299787005]
-        ])
-        M1_inv = np.linalg.inv(M1)
+        Если различных кандидатов меньше required, выборка удваивается,
+        иначе палитра вышла бы короче запрошенной. ValueError, если
+        столько различных цветов не набрать
+        """
+        if required > 1 << 24:
+            raise ValueError(f"Различных цветов RGB меньше {required}")
+        Metrics.log(f"📊 Сэмплирование {num_samples} точек ({sampling}, seed={seed})...")
 
-        lin_rgb = M1_inv @ lms
-        r = linear_to_rgb(lin_rgb[0]) * 255
-        g = linear_to_rgb(lin_rgb[1]) * 255
-        b = linear_to_rgb(lin_rgb[2]) * 255
+        rgb_points, oklab_points = ColorSampler.candidates(num_samples, sampling, seed)
+        while ColorGenerator._unique_count(rgb_points) < required:
+            if num_samples >= MAX_SAMPLES:
+                raise ValueError(f"Не набрать {required} различных цветов-кандидатов")
+            num_samples *= 2
+            Metrics.log(f"📊 Кандидатов меньше {required} - увеличиваем выборку до {num_samples}")
+            rgb_points, oklab_points = ColorSampler.candidates(num_samples, sampling, seed)
 
-        # Clip to 0-255
-        r = max(0, min(255, r))
-        g = max(0, min(255, g))
-        b = max(0, min(255, b))
+        Metrics.count('samples', len(rgb_points))
+        Metrics.log(f"✅ Сэмплировано {len(rgb_points)} валидных точек")
 
-        return int(round(r)), int(round(g)), int(round(b))
+        return rgb_points, oklab_points
 
     @staticmethod
-    def generate_fps_oklab_colors(n, num_samples=10000):
+    def generate_fps_oklab_colors(n, num_samples=10000, seed=None, sampling='random'):
         """
         🌈 GOLD STANDARD: Farthest-Point Sampling в OKLab
 
@@ -216,79 +275,198 @@ class ColorGenerator:
         в перцептивно равномерном OKLab пространстве.
 
         Параметры:
-        - n: количество цветов (рекомендуется ≤ 40)
+        - n: количество цветов
         - num_samples: количество сэмплов для поиска (больше = лучше, но медленнее)
+        - seed: seed выборки кандидатов (одинаковый seed - одинаковая палитра)
+        - sampling: 'random', 'sobol', 'halton' или 'stratified' (см. ColorSampler)
 
         Возвращает: список кортежей (r, g, b)
         """
-        if n > 40:
-            print("⚠️ Предупреждение: для n > 40 рекомендуется увеличить num_samples")
+        Metrics.log(f"🎨 Генерация {n} цветов методом FPS в OKLab...")
+
+        rgb_points, oklab_points = ColorGenerator._sample_fps_candidates(num_samples, seed, sampling, n)
+
+        if len(rgb_points) == 0:
+            return []
+
+        # Выбираем первую точку - ищем самый насыщенный цвет (s * v = (max - min) / 255)
+        first_index = int(np.argmax(np.ptp(rgb_points, axis=1)))
+
+        Metrics.log(f"🎯 FPS: выбор максимально удалённых цветов...")
+
+        selected_indices = ColorGenerator.farthest_point_sampling(oklab_points, n, first_index)
+
+        colors = [tuple(int(c) for c in rgb_points[i]) for i in selected_indices]
+
+        Metrics.log(f"✨ Готово! Сгенерировано {len(colors)} максимально различимых цветов")
+
+        return colors
+
+    @staticmethod
+    def _expand_ranges(starts, counts):
+        """Склеенные индексы диапазонов [start, start + count)"""
+        total = int(counts.sum())
+        offsets = np.cumsum(counts) - counts
+        return np.repeat(starts - offsets, counts) + np.arange(total)
+
+    @staticmethod
+    def grid_farthest_point_sampling(points, n, first_index=0, max_cells_per_axis=64):
+        """
+        Farthest-Point Sampling с равномерной сеткой по пространству
 
-        print(f"🎨 Генерация {n} цветов методом FPS в OKLab...")
-        print(f"📊 Сэмплирование {num_samples} точек...")
+        Точки раскладываются по ячейкам сетки, для каждой ячейки хранится
+        максимум минимальных расстояний. Новая точка может уменьшить
+        расстояние только тем кандидатам, что ближе текущего радиуса выбора,
+        поэтому обновляются лишь ячейки в кубе этого радиуса, а поиск
+        максимума идёт по ячейкам. Результат совпадает с обычным FPS,
+        но работа на выбор падает вместе с радиусом - это и даёт тысячи цветов.
 
-        # Генерируем случайные RGB точки
-        rgb_points = []
-        oklab_points = []
+        Возвращает: (индексы выбранных точек, расстояние последнего выбора)
+        """
+        points = np.asarray(points, dtype=np.float32)
+        size = len(points)
+        count = min(n, size)
+        if count <= 0:
+            return np.empty(0, dtype=np.intp), 0.0
+
+        lo = points.min(axis=0)
+        span = np.maximum(points.max(axis=0) - lo, 1e-6)
+
+        # Ячейка порядка половины ожидаемого итогового расстояния между цветами
+        cell = (np.prod(span) / count) ** (1 / 3) / 2
+        dims = np.clip(np.ceil(span / cell), 1, max_cells_per_axis).astype(np.int64)
+        cell_size = span / dims
+        num_cells = int(np.prod(dims))
+
+        coords = np.minimum(((points - lo) / cell_size).astype(np.int64), dims - 1)
+        cell_id = (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+        order = np.argsort(cell_id, kind='stable')
+        points = points[order]
+        cell_start = np.searchsorted(cell_id[order], np.arange(num_cells + 1))
+
+        min_dist = np.full(size, np.inf, dtype=np.float32)
+        cell_max = np.where(cell_start[1:] > cell_start[:-1], np.inf, -np.inf).astype(np.float32)
+
+        position = np.empty(size, dtype=np.intp)
+        position[order] = np.arange(size)
+
+        selected = np.empty(count, dtype=np.intp)
+        best = position[first_index]
+        radius = np.inf
+
+        for iteration in range(count):
+            selected[iteration] = order[best]
+            point = points[best]
+
+            # Ячейки в кубе радиуса вокруг новой точки (все при первом выборе)
+            if np.isinf(radius):
+                cells = np.arange(num_cells)
+            else:
+                c_lo = np.clip(np.floor((point - radius - lo) / cell_size), 0, dims - 1).astype(np.int64)
+                c_hi = np.clip(np.floor((point + radius - lo) / cell_size), 0, dims - 1).astype(np.int64)
+                xs, ys, zs = np.meshgrid(np.arange(c_lo[0], c_hi[0] + 1), np.arange(c_lo[1], c_hi[1] + 1),
+                                         np.arange(c_lo[2], c_hi[2] + 1), indexing='ij')
+                cells = ((xs * dims[1] + ys) * dims[2] + zs).ravel()
 
-        for _ in range(num_samples):
-            r = random.randint(0, 255)
-            g = random.randint(0, 255)
-            b = random.randint(0, 255)
+            counts = cell_start[cells + 1] - cell_start[cells]
+            idx = ColorGenerator._expand_ranges(cell_start[cells], counts)
 
-            # Пропускаем слишком тёмные цвета (для лучшей различимости)
-            if r + g + b < 60:
-                continue
+            diff = points[idx] - point
+            dist = np.einsum('ij,ij->i', diff, diff)
+            local = np.minimum(min_dist[idx], dist)
+            min_dist[idx] = local
+            min_dist[best] = -1.0
+            local[np.searchsorted(idx, best)] = -1.0
 
-            rgb_points.append((r, g, b))
-            oklab_points.append(ColorGenerator.rgb_to_oklab(r, g, b))
+            nonempty = counts > 0
+            offsets = (np.cumsum(counts) - counts)[nonempty]
+            cell_max[cells[nonempty]] = np.maximum.reduceat(local, offsets)
 
-        print(f"✅ Сэмплировано {len(rgb_points)} валидных точек")
+            if iteration + 1 == count:
+                break
 
-        # Выбираем первую точку - ищем самый насыщенный цвет
-        max_saturation = -1
-        first_index = 0
-        for i, (r, g, b) in enumerate(rgb_points):
-            h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
-            if s * v > max_saturation:
-                max_saturation = s * v
-                first_index = i
+            best_cell = int(np.argmax(cell_max))
+            start = cell_start[best_cell]
+            best = start + int(np.argmax(min_dist[start:cell_start[best_cell + 1]]))
+            radius = float(np.sqrt(max(min_dist[best], 0.0)))
 
-        selected_indices = [first_index]
-        selected_oklab = [oklab_points[first_index]]
+        return selected, (radius if count > 1 else 0.0)
 
-        print(f"🎯 FPS: выбор максимально удалённых цветов...")
+    @staticmethod
+    def _fps_min_delta_e(selected_points):
+        """
+        Минимальное расстояние между точками, выбранными FPS по порядку
 
-        # Farthest-Point Sampling
-        for iteration in range(1, n):
-            max_min_dist = -float('inf')
-            best_index = -1
+        Радиус выбора FPS не растёт, поэтому ближайшая пара включает
+        последнюю точку: достаточно её расстояний до остальных - O(n)
+        """
+        points = np.asarray(selected_points, dtype=np.float64)
+        if len(points) < 2:
+            return 0.0
+        diff = points[:-1] - points[-1]
+        return float(np.sqrt(np.einsum('ij,ij->i', diff, diff).min()))
 
-            for i in range(len(oklab_points)):
-                if i in selected_indices:
-                    continue
+    @staticmethod
+    def generate_large_fps_oklab_colors(n, num_samples=262144, seed=None, sampling='random'):
+        """
+        FPS в OKLab для больших палитр (сотни и тысячи цветов)
+
+        Кандидаты без повторов хранятся в float32. От GRID_FPS_MIN_CANDIDATES
+        различных кандидатов (после фильтра яркости) выбор идёт через
+        grid_farthest_point_sampling (память растёт с num_samples и n,
+        а не с их произведением), на меньших наборах обычный
+        farthest_point_sampling быстрее. Достигнутое минимальное ΔE
+        (расстояние в OKLab между ближайшими выбранными цветами)
+        записывается в метрику palette_min_delta_e.
+        seed и sampling - как в generate_fps_oklab_colors.
+
+        Возвращает: список кортежей (r, g, b)
+        """
+        Metrics.log(f"🎨 Генерация {n} цветов методом сеточного FPS в OKLab...")
+
+        rgb_points, _ = ColorGenerator._sample_fps_candidates(num_samples, seed, sampling, n)
+        rgb_points = np.unique(rgb_points, axis=0)
+
+        if len(rgb_points) == 0:
+            return []
 
-                # Находим минимальное расстояние до уже выбранных цветов
-                min_dist = min(
-                    math.sqrt(sum((x - y) ** 2 for x, y in zip(oklab_points[i], s)))
-                    for s in selected_oklab
-                )
+        oklab_points = ColorSpace.rgb_to_oklab(rgb_points).astype(np.float32)
+        first_index = int(np.argmax(np.ptp(rgb_points, axis=1)))
 
-                # Выбираем точку с максимальным минимальным расстоянием
-                if min_dist > max_min_dist:
-                    max_min_dist = min_dist
-                    best_index = i
+        if len(rgb_points) < GRID_FPS_MIN_CANDIDATES:
+            selected_indices = ColorGenerator.farthest_point_sampling(oklab_points, n, first_index)
+            min_delta_e = ColorGenerator._fps_min_delta_e(oklab_points[selected_indices])
+            mode = f"обычный FPS, {len(rgb_points)} кандидатов"
+        else:
+            selected_indices, min_delta_e = ColorGenerator.grid_farthest_point_sampling(oklab_points, n, first_index)
+            mode = f"сеточный FPS, {len(rgb_points)} кандидатов"
 
-            if best_index != -1:
-                selected_indices.append(best_index)
-                selected_oklab.append(oklab_points[best_index])
+        colors = [tuple(int(c) for c in rgb_points[i]) for i in selected_indices]
+
+        Metrics.gauge('palette_min_delta_e', min_delta_e)
+        Metrics.log(f"✨ Готово! Сгенерировано {len(colors)} цветов ({mode}), "
+                    f"минимальное ΔE (OKLab): {min_delta_e:.4f}")
+
+        return colors
+
+    @staticmethod
+    def extend_fps_oklab_colors(existing, n, num_samples=10000, seed=None, sampling='random'):
+        """
+        Продолжает FPS в OKLab от уже выбранных цветов existing
+
+        Возвращает n новых цветов, максимально удалённых и друг от друга,
+        и от existing (сами existing не меняются)
+        """
+        if not existing:
+            return ColorGenerator.generate_fps_oklab_colors(n, num_samples, seed, sampling)
 
-                if (iteration + 1) % 5 == 0:
-                    print(f"  → {iteration + 1}/{n} цветов выбрано")
+        Metrics.log(f"🎨 Добавление {n} цветов к {len(existing)} методом FPS в OKLab...")
 
-        # Конвертируем обратно в RGB
-        colors = [rgb_points[i] for i in selected_indices]
+        rgb_points, oklab_points = ColorGenerator._sample_fps_candidates(
+            num_samples, seed, sampling, n + len(existing)
+        )
+        initial = ColorSpace.rgb_to_oklab(np.asarray(existing))
 
-        print(f"✨ Готово! Сгенерировано {len(colors)} максимально различимых цветов")
+        selected_indices = ColorGenerator.farthest_point_sampling(oklab_points, n, initial=initial)
 
-        return colors
\ No newline at end of file
+        return [tuple(int(c) for c in rgb_points[i]) for i in selected_indices]
@@ -0,0 +1,110 @@
+"""
+Кандидаты для генераторов палитр: воспроизводимые выборки и векторные фильтры
+"""
+import numpy as np
+from ColorSpace import ColorSpace
+
+SAMPLINGS = ('random', 'sobol', 'halton', 'stratified')
+
+# Направляющие числа Соболя (Joe, Kuo) для второго и третьего измерений:
+# (степень примитивного многочлена, его коэффициенты, начальные m)
+SOBOL_POLYNOMIALS = ((1, 0, (1,)), (2, 1, (1, 3)))
+SOBOL_BITS = 32
+
+HALTON_BASES = (2, 3, 5)
+
+
+class ColorSampler:
+    """
+    Кандидаты для Farthest-Point Sampling
+
+    Точки единичного куба генерируются целиком массивами из
+    np.random.Generator с заданным seed, поэтому при одинаковом seed
+    палитра одинакова до байта (и её можно кэшировать):
+    - 'random' - равномерно случайные;
+    - 'sobol', 'halton' - квази-случайные последовательности со случайным
+      сдвигом: куб покрывается равномернее, и для того же качества
+      палитры нужно меньше кандидатов;
+    - 'stratified' - по одной случайной точке в каждой ячейке сетки k³.
+
+    Куб отображается в RGB 0..255 (все кандидаты заведомо в гамуте sRGB),
+    слишком тёмные цвета отсекаются векторным фильтром яркости.
+    """
+
+    @staticmethod
+    def _sobol_directions():
+        """Направляющие числа (3, SOBOL_BITS): первое измерение - ван дер Корпут"""
+        directions = np.zeros((3, SOBOL_BITS), dtype=np.uint64)
+        directions[0] = [1 << (SOBOL_BITS - 1 - j) for j in range(SOBOL_BITS)]
+
+        for dim, (degree, coefficients, initial) in enumerate(SOBOL_POLYNOMIALS, start=1):
+            m = list(initial)
+            for j in range(degree, SOBOL_BITS):
+                value = m[j - degree] ^ (m[j - degree] << degree)
+                for k in range(1, degree):
+                    if (coefficients >> (degree - 1 - k)) & 1:
+                        value ^= m[j - k] << k
+                m.append(value)
+            directions[dim] = [m[j] << (SOBOL_BITS - 1 - j) for j in range(SOBOL_BITS)]
+
+        return directions
+
+    @staticmethod
+    def sobol(num_samples, rng):
+        """Точки Соболя (N, 3) в [0, 1) со случайным цифровым сдвигом (XOR)"""
+        directions = ColorSampler._sobol_directions()
+        index = np.arange(num_samples, dtype=np.uint64)
+        points = np.zeros((num_samples, 3), dtype=np.uint64)
+        for bit in range(min(SOBOL_BITS, max(num_samples - 1, 1).bit_length())):
+            mask = ((index >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+            points[mask] ^= directions[:, bit]
+
+        shift = rng.integers(0, 1 << SOBOL_BITS, size=3, dtype=np.uint64)
+        return (points ^ shift) / float(1 << SOBOL_BITS)
+
+    @staticmethod
+    def halton(num_samples, rng):
+        """Точки Халтона (N, 3) в [0, 1) по основаниям 2, 3, 5 со случайным сдвигом по модулю 1"""
+        points = np.zeros((num_samples, 3))
+        for dim, base in enumerate(HALTON_BASES):
+            index = np.arange(1, num_samples + 1)
+            scale = 1.0
+            while index.any():
+                scale /= base
+                index, digit = np.divmod(index, base)
+                points[:, dim] += digit * scale
+        return (points + rng.random(3)) % 1.0
+
+    @staticmethod
+    def stratified(num_samples, rng):
+        """По точке в каждой ячейке сетки k³ (k³ ≈ num_samples)"""
+        k = max(1, int(round(num_samples ** (1 / 3))))
+        cells = np.stack(np.meshgrid(*[np.arange(k)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+        return (cells + rng.random(cells.shape)) / k
+
+    @staticmethod
+    def unit_cube(num_samples, sampling='random', seed=None):
+        """Точки (N, 3) единичного куба выбранным способом"""
+        if sampling not in SAMPLINGS:
+            raise ValueError(f"Неизвестный способ выборки '{sampling}'")
+        rng = np.random.default_rng(seed)
+        if sampling == 'random':
+            return rng.random((num_samples, 3))
+        return getattr(ColorSampler, sampling)(num_samples, rng)
+
+    @staticmethod
+    def bright_enough(rgb, min_sum=60):
+        """Маска цветов с суммой каналов не меньше min_sum (отсекает почти чёрные)"""
+        return np.asarray(rgb, dtype=np.int64).sum(axis=-1) >= min_sum
+
+    @staticmethod
+    def candidates(num_samples, sampling='random', seed=None, min_brightness=60):
+        """
+        Кандидаты для FPS: RGB uint8 (M, 3) и их OKLab (M <= num_samples)
+
+        seed - целое для воспроизводимого результата (None - каждый раз новая выборка)
+        """
+        points = ColorSampler.unit_cube(num_samples, sampling, seed)
+        rgb = np.minimum(points * 256, 255).astype(np.uint8)
+        rgb = rgb[ColorSampler.bright_enough(rgb, min_brightness)]
+        return rgb, ColorSpace.rgb_to_oklab(rgb)
@@ -0,0 +1,74 @@
+"""
+Пакетная конвертация цветовых пространств (RGB ↔ OKLab, RGB → CIE Lab)
+
+Все функции принимают массивы (N, 3) (или один цвет (3,)) в uint8/float
+и возвращают массивы той же формы. Матрицы и их обратные считаются один раз
+при импорте модуля.
+"""
+import numpy as np
+
+# Линейный RGB -> LMS
+M1 = np.array([
+    [0.4122214708, 0.5363325363, 0.0514459929],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005]
+])
+
+# LMS' -> OKLab
+M2 = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757667]
+])
+
+M1_INV = np.linalg.inv(M1)
+M2_INV = np.linalg.inv(M2)
+
+# Линейный RGB -> XYZ (D65)
+RGB_TO_XYZ = np.array([
+    [0.4124, 0.3576, 0.1805],
+    [0.2126, 0.7152, 0.0722],
+    [0.0193, 0.1192, 0.9505]
+])
+
+# Опорный белый D65
+XYZ_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+class ColorSpace:
+
+    @staticmethod
+    def srgb_to_linear(v):
+        """Гамма sRGB -> линейные значения (v в диапазоне 0..1)"""
+        v = np.asarray(v, dtype=np.float64)
+        return np.where(v > 0.04045, ((v + 0.055) / 1.055) ** 2.4, v / 12.92)
+
+    @staticmethod
+    def linear_to_srgb(v):
+        """Линейные значения -> гамма sRGB (v в диапазоне 0..1)"""
+        v = np.asarray(v, dtype=np.float64)
+        # Степень считаем только от положительных значений, чтобы не получить NaN
+        powered = 1.055 * np.maximum(v, 0.0031308) ** (1 / 2.4) - 0.055
+        return np.where(v > 0.0031308, powered, 12.92 * v)
+
+    @staticmethod
+    def rgb_to_oklab(rgb):
+        """RGB (0..255) -> OKLab [L, a, b]"""
+        lin = ColorSpace.srgb_to_linear(np.asarray(rgb, dtype=np.float64) / 255.0)
+        return np.cbrt(lin @ M1.T) @ M2.T
+
+    @staticmethod
+    def oklab_to_rgb(oklab):
+        """OKLab [L, a, b] -> RGB uint8 (0..255, с обрезкой по гамуту)"""
+        lms = (np.asarray(oklab, dtype=np.float64) @ M2_INV.T) ** 3
+        rgb = ColorSpace.linear_to_srgb(lms @ M1_INV.T) * 255
+        return np.rint(np.clip(rgb, 0, 255)).astype(np.uint8)
+
+    @staticmethod
+    def rgb_to_lab(rgb):
+        """RGB (0..255) -> CIE Lab [L, a, b]"""
+        lin = ColorSpace.srgb_to_linear(np.asarray(rgb, dtype=np.float64) / 255.0)
+        xyz = (lin @ RGB_TO_XYZ.T) / XYZ_WHITE
+        f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+        fx, fy, fz = f[..., 0], f[..., 1], f[..., 2]
+        return np.stack([116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)], axis=-1)
@@ -0,0 +1,319 @@
+"""
+Резидентный сервис раскраски: asyncio-сервер на Unix-сокете или localhost TCP
+
+Запуск:
+    python ColorizerDaemon.py serve                        # Unix-сокет Config.DAEMON_SOCKET
+    python ColorizerDaemon.py serve --port 8765            # localhost TCP
+    python ColorizerDaemon.py send < data/example.txt      # тестовый клиент
+    python ColorizerDaemon.py send --port 8765 --formats css tree < data/example.txt
+    python ColorizerDaemon.py stats
+
+Протокол - JSON по строке на сообщение. Запрос:
+    {"id": 1, "dump": "<текст дампа>", "method": "fps_oklab",
+     "formats": ["selectors", "css", "tree", "paths"]}
+Ответ:
+    {"id": 1, "ok": true, "ids": [...], "classes": [...],
+     "css": "...", "tree": "...", "paths": [...], "seconds": 0.01}
+Служебные запросы: {"op": "ping"}, {"op": "stats"}.
+По одному соединению можно отправить сколько угодно запросов подряд.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import Config, METHODS
+from Metrics import Metrics
+from PaletteCache import PaletteCache
+from SelectorExtractor import SelectorExtractor
+from SelectorColorMapper import SelectorColorMapper
+from SelectorProcessor import _generate_worker
+from TreeBuilder import TreeBuilder
+
+FORMATS = ('selectors', 'css', 'tree', 'paths')
+
+
+def _warm_worker(module_names):
+    """Инициализация процесса пула: модули генераторов (и numpy) импортируются заранее"""
+    for module_name in module_names:
+        __import__(module_name)
+
+
+def _analyze(dump, formats):
+    """Селекторы и дерево одного дампа (в потоке, чтобы не держать цикл событий)"""
+    data = dump.encode('utf-8')
+    ids, classes = SelectorExtractor.extract_bytes(data)
+    result = {'ids': ids, 'classes': classes}
+    if 'tree' in formats or 'paths' in formats:
+        trie, paths = TreeBuilder.build_from_lines(dump.splitlines())
+        if 'tree' in formats:
+            result['tree'] = ''.join(trie.iter_lines())
+        if 'paths' in formats:
+            result['paths'] = paths
+    return result
+
+
+def _render_css(method, groups):
+    """CSS для групп (тип, селекторы, палитра) - как SelectorColorMapper.generate_css"""
+    parts = [SelectorColorMapper.css_header(method)]
+    for selector_type, selectors, colors in groups:
+        prefix = SelectorColorMapper._prefix(selector_type)
+        parts.extend(SelectorColorMapper.css_block(prefix, name, rgb) for name, rgb in zip(selectors, colors))
+    return ''.join(parts)
+
+
+class ColorizerDaemon:
+    """
+    Сервис с тёплыми палитрами
+
+    Палитры хранятся в памяти по (метод, n) и берутся из дискового кэша
+    при первом обращении; генерация уходит в пул процессов, заранее
+    импортировавших модули генераторов. Одновременно одну палитру
+    генерирует только один воркер - остальные запросы ждут её результат.
+    Количество одновременно обрабатываемых запросов ограничено семафором.
+    """
+
+    def __init__(self, workers=None, max_concurrent=None, cache=None):
+        self.workers = workers or Config.DAEMON_WORKERS or os.cpu_count()
+        self.max_concurrent = max_concurrent or Config.DAEMON_MAX_CONCURRENT
+        self.cache = cache
+        self.palettes = {}  # (метод, n) -> палитра или Future генерации
+        self.pool = None
+        self.semaphore = None
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+
+    def start_pool(self):
+        module_names = sorted({method.module_name for method in METHODS.values()})
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        initializer=_warm_worker, initargs=(module_names,))
+
+    async def palette(self, method_key, n):
+        """Палитра из памяти, дискового кэша или пула процессов"""
+        key = (method_key, n)
+        palette = self.palettes.get(key)
+        if isinstance(palette, asyncio.Future):
+            return await asyncio.shield(palette)
+        if palette is not None:
+            return palette
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.palettes[key] = future
+        method = METHODS[method_key]
+        try:
+            with Metrics.span('palette'):
+                cache_key = self.cache.make_key(method, n) if self.cache else None
+                palette = self.cache.get(cache_key) if self.cache else None
+                if palette is None:
+                    palette = await loop.run_in_executor(self.pool, _generate_worker, method, n)
+                    if self.cache:
+                        self.cache.put(cache_key, palette)
+        except BaseException as e:
+            del self.palettes[key]
+            future.set_exception(e)
+            # Исключение уже передано ожидающим - чтобы не было предупреждения
+            future.exception()
+            raise
+
+        self.palettes[key] = palette
+        future.set_result(palette)
+        return palette
+
+    async def colorize(self, request):
+        """Ответ на запрос раскраски"""
+        method_key = request.get('method') or Config.COLOR_METHOD
+        if method_key not in METHODS:
+            raise ValueError(f"Неизвестный метод '{method_key}'")
+        formats = request.get('formats') or FORMATS
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Неизвестные форматы: {sorted(unknown)}")
+        dump = request.get('dump', '')
+
+        with Metrics.span('extract'):
+            result = await asyncio.to_thread(_analyze, dump, formats)
+        ids, classes = result['ids'], result['classes']
+        Metrics.count('selectors', len(ids) + len(classes))
+
+        if 'css' in formats:
+            groups = [(selector_type, selectors, await self.palette(method_key, len(selectors)))
+                      for selector_type, selectors in (('id', ids), ('class', classes)) if selectors]
+            with Metrics.span('css_html'):
+                result['css'] = _render_css(METHODS[method_key], groups)
+
+        if 'selectors' not in formats:
+            del result['ids'], result['classes']
+        return result
+
+    def stats(self):
+        warm = sorted(f'{method_key}:{n}' for (method_key, n), palette in self.palettes.items()
+                      if not isinstance(palette, asyncio.Future))
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'uptime': round(time.time() - self.started, 3),
+            'workers': self.workers,
+            'max_concurrent': self.max_concurrent,
+            'palettes': warm,
+            'cache': self.cache.stats() if self.cache else None,
+        }
+
+    async def handle_request(self, request):
+        op = request.get('op', 'colorize')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'stats':
+            return {'ok': True, **self.stats()}
+        if op != 'colorize':
+            raise ValueError(f"Неизвестная операция '{op}'")
+
+        async with self.semaphore:
+            start = time.perf_counter()
+            result = await self.colorize(request)
+            self.requests += 1
+            return {'ok': True, **result, 'seconds': round(time.perf_counter() - start, 6)}
+
+    async def handle_connection(self, reader, writer):
+        """Соединение: запросы по строке, ответы в том же порядке"""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Строка длиннее DAEMON_MAX_REQUEST_BYTES - дальше поток не разобрать
+                    self.errors += 1
+                    writer.write(b'{"ok": false, "error": "request too large"}\n')
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get('id')
+                    response = await self.handle_request(request)
+                except Exception as e:
+                    self.errors += 1
+                    response = {'ok': False, 'error': str(e)}
+                if request_id is not None:
+                    response['id'] = request_id
+
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                # Не читаем следующий запрос, пока клиент не забирает ответы
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path=None, host=None, port=None):
+        """Запуск сервера: Unix-сокет path или TCP host:port"""
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.start_pool()
+        limit = Config.DAEMON_MAX_REQUEST_BYTES
+
+        if port is not None:
+            server = await asyncio.start_server(self.handle_connection, host or Config.DAEMON_HOST, port,
+                                                limit=limit)
+            address = f"{host or Config.DAEMON_HOST}:{port}"
+        else:
+            path = path or Config.DAEMON_SOCKET
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await asyncio.start_unix_server(self.handle_connection, path, limit=limit)
+            address = path
+
+        Metrics.log(f"🚀 Сервис запущен: {address}, процессов: {self.workers}, "
+                    f"одновременных запросов: {self.max_concurrent}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if port is None and os.path.exists(path):
+                os.unlink(path)
+            Metrics.export()
+
+
+class ColorizerClient:
+    """Простой синхронный клиент сервиса (для тестов и скриптов)"""
+
+    def __init__(self, path=None, host=None, port=None, timeout=60):
+        if port is not None:
+            self.sock = socket.create_connection((host or Config.DAEMON_HOST, port), timeout=timeout)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path or Config.DAEMON_SOCKET)
+        self.file = self.sock.makefile('rwb')
+        self.next_id = 0
+
+    def request(self, payload):
+        """Отправляет запрос и ждёт ответ"""
+        self.next_id += 1
+        payload = dict(payload, id=self.next_id)
+        self.file.write(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Сервис закрыл соединение")
+        return json.loads(line)
+
+    def colorize(self, dump, formats=FORMATS, method=None):
+        return self.request({'dump': dump, 'formats': list(formats), 'method': method})
+
+    def stats(self):
+        return self.request({'op': 'stats'})
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Резидентный сервис ScreenColorizer')
+    parser.add_argument('command', choices=('serve', 'send', 'stats'))
+    parser.add_argument('--socket', help=f'Unix-сокет (по умолчанию {Config.DAEMON_SOCKET})')
+    parser.add_argument('--host', help=f'адрес TCP (по умолчанию {Config.DAEMON_HOST})')
+    parser.add_argument('--port', type=int, help='порт TCP вместо Unix-сокета')
+    parser.add_argument('--workers', type=int, help='процессов для генерации палитр')
+    parser.add_argument('--max-concurrent', type=int, help='одновременно обрабатываемых запросов')
+    parser.add_argument('--method', choices=sorted(METHODS), help='метод генерации цветов (send)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS), help='что вернуть (send)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        Config.VERBOSE = True
+        cache = PaletteCache(Config.CACHE_DIR, Config.CACHE_MAX_BYTES) if Config.CACHE_ENABLED else None
+        daemon = ColorizerDaemon(args.workers, args.max_concurrent, cache)
+        try:
+            asyncio.run(daemon.serve(args.socket, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    with ColorizerClient(args.socket, args.host, args.port) as client:
+        if args.command == 'stats':
+            response = client.stats()
+        else:
+            response = client.colorize(sys.stdin.read(), args.formats, args.method)
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0 if response.get('ok') else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Сортировка с удалением повторов в ограниченной памяти (внешняя сортировка)
+"""
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+
+# Примерные накладные расходы множества на один элемент (слот, хэш, указатель)
+SET_ENTRY_OVERHEAD = 64
+
+
+class ExternalSort:
+    """
+    Уникальные строки в порядке sorted() при ограниченной памяти
+
+    Строки копятся в множестве, пока их оценочный размер не превысит
+    memory_budget байт. Тогда множество сортируется и сбрасывается
+    на диск отдельным прогоном (по строке на запись), а затем все
+    прогоны сливаются через heapq.merge с удалением повторов между
+    прогонами. Если прогонов больше max_runs, они сливаются по частям.
+    Без memory_budget всё остаётся в памяти - результат тот же.
+
+    Строки не должны содержать перевод строки.
+    """
+
+    MAX_RUNS = 64
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, memory_budget=None, tmp_dir=None, max_runs=None):
+        self.memory_budget = memory_budget
+        self.tmp_dir = tmp_dir
+        self.max_runs = max_runs or self.MAX_RUNS
+        self.items = set()
+        self.size = 0
+        self.runs = []
+        self.spilled = 0
+        self._dir = None
+        # Буферы открытых при слиянии прогонов тоже укладываются в бюджет
+        self.buffer_size = self.BUFFER_SIZE
+        if memory_budget is not None:
+            self.buffer_size = max(4096, min(self.BUFFER_SIZE, memory_budget // (self.max_runs + 1)))
+
+    def add(self, item):
+        """Добавляет строку; True, если её нет в текущем прогоне в памяти"""
+        if item in self.items:
+            return False
+        self.items.add(item)
+        if self.memory_budget is not None:
+            self.size += sys.getsizeof(item) + SET_ENTRY_OVERHEAD
+            if self.size > self.memory_budget:
+                self._spill()
+        return True
+
+    def _new_run_path(self):
+        if self._dir is None:
+            if self.tmp_dir:
+                os.makedirs(self.tmp_dir, exist_ok=True)
+            self._dir = tempfile.mkdtemp(prefix='paths_', dir=self.tmp_dir)
+        return os.path.join(self._dir, f'run_{self.spilled:06d}.txt')
+
+    def _write_run(self, items):
+        path = self._new_run_path()
+        self.spilled += 1
+        with open(path, 'w', encoding='utf-8', buffering=self.buffer_size) as f:
+            for item in items:
+                f.write(item + '\n')
+        return path
+
+    def _spill(self):
+        """Сбрасывает текущее множество на диск отсортированным прогоном"""
+        self.runs.append(self._write_run(sorted(self.items)))
+        self.items = set()
+        self.size = 0
+
+    def _read_run(self, path):
+        with open(path, 'r', encoding='utf-8', buffering=self.buffer_size) as f:
+            for line in f:
+                yield line[:-1]
+
+    def _merge(self, sources):
+        """Слияние отсортированных источников без повторов"""
+        previous = None
+        for item in heapq.merge(*sources):
+            if item != previous:
+                yield item
+                previous = item
+
+    def __iter__(self):
+        """Уникальные строки по возрастанию (один раз, затем временные файлы удаляются)"""
+        try:
+            if not self.runs:
+                yield from sorted(self.items)
+                return
+
+            if self.items:
+                self._spill()
+
+            # Слишком много прогонов - сливаем частями, чтобы не держать много файлов открытыми
+            while len(self.runs) > self.max_runs:
+                batch, self.runs = self.runs[:self.max_runs], self.runs[self.max_runs:]
+                self.runs.append(self._write_run(self._merge([self._read_run(p) for p in batch])))
+                for path in batch:
+                    os.remove(path)
+
+            yield from self._merge([self._read_run(p) for p in self.runs])
+        finally:
+            self.close()
+
+    def __del__(self):
+        # Результат, который так и не обошли, не оставляет временных файлов
+        if self._dir is not None:
+            self.close()
+
+    def close(self):
+        """Удаляет временные файлы"""
+        self.items = set()
+        self.runs = []
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
@@ -1,17 +1,24 @@
 class HtmlCreator:
     @staticmethod
-    def create_html_table(colors):
-        # Создаём HTML-таблицу
-        html = '<table border="1" style="border-collapse: collapse;">\n'
-        html += '  <tr>\n'
-        
+    def _table_lines(colors):
+        """Строки HTML-таблицы (генератор)"""
+        yield '<table border="1" style="border-collapse: collapse;">\n'
+        yield '  <tr>\n'
+
         for rgb in colors:
             r, g, b = rgb
             color_str = f"rgb({r}, {g}, {b})"
-            html += f'    <td style="background-color: {color_str}; width: 100px; height: 50px; text-align: center; color: #fff;">{color_str}</td>\n'
-        
-        html += '  </tr>\n'
-        html += '</table>'
-        
-        return html
-        
\ No newline at end of file
+            yield f'    <td style="background-color: {color_str}; width: 100px; height: 50px; text-align: center; color: #fff;">{color_str}</td>\n'
+
+        yield '  </tr>\n'
+        yield '</table>'
+
+    @staticmethod
+    def create_html_table(colors):
+        # Создаём HTML-таблицу
+        return ''.join(HtmlCreator._table_lines(colors))
+
+    @staticmethod
+    def write_html_table(colors, file):
+        """Потоково записывает HTML-таблицу в открытый файл"""
+        file.writelines(HtmlCreator._table_lines(colors))
@@ -0,0 +1,271 @@
+"""
+Виртуализированное HTML-превью для больших наборов селекторов
+"""
+import glob
+import json
+import os
+
+from OutputWriter import OutputWriter
+
+PREVIEW_MODES = ('full', 'virtual', 'auto')
+
+PREVIEW_STYLE = '''    <style>
+        body { font-family: Arial; padding: 20px; background: #f5f5f5; }
+        h1 { text-align: center; color: #333; }
+        .method { text-align: center; color: #666; margin: 20px; }
+        .search { display: block; margin: 0 auto 10px; width: 320px; padding: 8px; font-size: 14px; }
+        .status { text-align: center; color: #666; margin-bottom: 20px; font-size: 13px; }
+        .grid { position: relative; }
+        .card { position: absolute; height: 140px; box-sizing: border-box; border: 1px solid #ddd; border-radius: 8px; overflow: hidden; background: white; }
+        .color { height: 100px; display: flex; align-items: center; justify-content: center; color: white; font-size: 11px; }
+        .name { padding: 10px; text-align: center; font-family: monospace; font-size: 13px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+    </style>
+'''
+
+# Рисует только видимые карточки; данные подгружаются тегами <script>
+# (JSONP), поэтому страница работает и открытой с диска (file://)
+PREVIEW_SCRIPT = '''    <script>
+    (function () {
+        var CARD_WIDTH = 150, CARD_HEIGHT = 140, GAP = 15, OVERSCAN = 2;
+        var meta = PREVIEW_META;
+        var grid = document.getElementById('grid');
+        var input = document.getElementById('search');
+        var status = document.getElementById('status');
+        var chunks = {}, pending = {};
+        var lower = null, order = null;
+        var view = null;  // null - все селекторы, иначе позиции найденных
+        var scheduled = false;
+
+        function load(name) {
+            if (pending[name]) return;
+            pending[name] = true;
+            var script = document.createElement('script');
+            script.src = meta.dir + '/' + name;
+            document.head.appendChild(script);
+        }
+
+        function item(position) {
+            var k = Math.floor(position / meta.chunkSize);
+            if (!(k in chunks)) {
+                load('chunk_' + ('00000' + k).slice(-5) + '.js');
+                return null;
+            }
+            return chunks[k][position % meta.chunkSize];
+        }
+
+        function escape(text) {
+            return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+        }
+
+        function card(data, top, left, width) {
+            var style = 'top:' + top + 'px;left:' + left + 'px;width:' + width + 'px;';
+            if (!data) return '<div class="card" style="' + style + '"></div>';
+            var rgb = data[1];
+            var color = 'rgb(' + (rgb >> 16) + ', ' + ((rgb >> 8) & 255) + ', ' + (rgb & 255) + ')';
+            return '<div class="card" style="' + style + '">' +
+                '<div class="color" style="background-color: ' + color + ';">' + color + '</div>' +
+                '<div class="name" title="' + escape(meta.prefix + data[0]) + '">' + escape(meta.prefix + data[0]) + '</div></div>';
+        }
+
+        function render() {
+            scheduled = false;
+            var count = view ? view.length : meta.count;
+            var columns = Math.max(1, Math.floor((grid.clientWidth + GAP) / (CARD_WIDTH + GAP)));
+            var width = (grid.clientWidth - GAP * (columns - 1)) / columns;
+            var rowHeight = CARD_HEIGHT + GAP;
+            var rows = Math.ceil(count / columns);
+            grid.style.height = rows * rowHeight + 'px';
+
+            var top = grid.getBoundingClientRect().top;
+            var first = Math.max(0, Math.floor(-top / rowHeight) - OVERSCAN);
+            var last = Math.min(rows, Math.ceil((window.innerHeight - top) / rowHeight) + OVERSCAN);
+            var html = [];
+            for (var row = first; row < last; row++) {
+                for (var column = 0; column < columns; column++) {
+                    var i = row * columns + column;
+                    if (i >= count) break;
+                    html.push(card(item(view ? view[i] : i), row * rowHeight, column * (width + GAP), width));
+                }
+            }
+            grid.innerHTML = html.join('');
+        }
+
+        function schedule() {
+            if (!scheduled) {
+                scheduled = true;
+                window.requestAnimationFrame(render);
+            }
+        }
+
+        function search() {
+            var query = input.value.trim().toLowerCase();
+            if (query.charAt(0) === meta.prefix) query = query.slice(1);
+            if (!query) {
+                view = null;
+                status.textContent = meta.count + ' шт.';
+                schedule();
+                return;
+            }
+            if (!lower) {
+                status.textContent = 'Загрузка индекса...';
+                load('search.js');
+                return;
+            }
+
+            // Сначала совпадения по началу имени (двоичный поиск по отсортированным), затем подстроки
+            var lo = 0, hi = order.length;
+            while (lo < hi) {
+                var mid = (lo + hi) >> 1;
+                if (lower[order[mid]] < query) lo = mid + 1; else hi = mid;
+            }
+            var found = [], seen = new Uint8Array(lower.length);
+            for (var j = lo; j < order.length && lower[order[j]].lastIndexOf(query, 0) === 0; j++) {
+                found.push(order[j]);
+                seen[order[j]] = 1;
+            }
+            for (var i = 0; i < lower.length; i++) {
+                if (!seen[i] && lower[i].indexOf(query) !== -1) found.push(i);
+            }
+            view = found;
+            status.textContent = 'Найдено: ' + found.length + ' из ' + meta.count;
+            window.scrollTo(0, 0);
+            schedule();
+        }
+
+        window.previewChunk = function (k, items) {
+            chunks[k] = items;
+            schedule();
+        };
+        window.previewSearch = function (names, sorted) {
+            lower = names.split('\\n').map(function (name) { return name.toLowerCase(); });
+            order = sorted;
+            search();
+        };
+
+        input.addEventListener('input', search);
+        window.addEventListener('scroll', schedule);
+        window.addEventListener('resize', schedule);
+        search();
+    })();
+    </script>
+'''
+
+
+class HtmlPreview:
+    """
+    HTML-превью из страницы-оболочки и чанков данных
+
+    Вместо карточки на каждый селектор пишется небольшая страница
+    (её размер не зависит от числа селекторов) и рядом директория
+    <страница>_data с JS-чанками по chunk_size пар (селектор, цвет)
+    и индексом поиска search.js. Страница рисует только видимые
+    карточки и подгружает нужные чанки при прокрутке; индекс
+    загружается при первом поиске. Поиск - по началу имени
+    (двоичный поиск по заранее отсортированным именам) и по подстроке.
+
+    Пары добавляются потоково через add(); чанки пишутся по мере
+    заполнения, в памяти остаются только имена для индекса.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, output_file, selector_type, method, chunk_size=None):
+        self.output_file = output_file
+        self.selector_type = selector_type
+        self.method = method
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.data_dir = self.data_path(output_file)
+        self.names = []
+        self.chunks = 0
+        self._items = []
+
+        # Чанки прошлого запуска могли остаться от большего набора
+        os.makedirs(self.data_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(self.data_dir, '*.js')):
+            os.remove(path)
+
+    @staticmethod
+    def data_path(output_file):
+        """Директория данных превью: selectors_ids.html -> selectors_ids_data"""
+        if output_file.endswith('.gz'):
+            output_file = output_file[:-3]
+        return os.path.splitext(output_file)[0] + '_data'
+
+    @staticmethod
+    def wanted(count, mode='auto', threshold=2000):
+        """Нужно ли виртуализированное превью для count селекторов в режиме mode"""
+        if mode not in PREVIEW_MODES:
+            raise ValueError(f"Неизвестный режим HTML-превью '{mode}'")
+        return mode == 'virtual' or (mode == 'auto' and count >= threshold)
+
+    @staticmethod
+    def _script(path, call, *args):
+        """JS-файл данных: вызов функции страницы с аргументами в JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"{call}({','.join(json.dumps(arg, ensure_ascii=False, separators=(',', ':')) for arg in args)});\n")
+
+    def add(self, selector, rgb):
+        r, g, b = rgb
+        self.names.append(selector)
+        self._items.append((selector, int(r) << 16 | int(g) << 8 | int(b)))
+        if len(self._items) == self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._items:
+            return
+        path = os.path.join(self.data_dir, f'chunk_{self.chunks:05d}.js')
+        self._script(path, 'previewChunk', self.chunks, self._items)
+        self.chunks += 1
+        self._items = []
+
+    def _shell(self):
+        meta = {
+            'count': len(self.names),
+            'chunkSize': self.chunk_size,
+            'prefix': '#' if self.selector_type == 'id' else '.',
+            'dir': os.path.basename(self.data_dir),
+        }
+        return (
+            '<!DOCTYPE html>\n'
+            '<html lang="ru">\n'
+            '<head>\n'
+            '    <meta charset="UTF-8">\n'
+            f'    <title>Цвета {self.selector_type}</title>\n'
+            + PREVIEW_STYLE +
+            '</head>\n'
+            '<body>\n'
+            f'    <h1>🎨 {self.selector_type.upper()} селекторы</h1>\n'
+            f'    <div class="method">{self.method.description}</div>\n'
+            '    <input id="search" class="search" type="search" placeholder="Поиск селектора">\n'
+            '    <div id="status" class="status"></div>\n'
+            '    <div id="grid" class="grid"></div>\n'
+            f'    <script>var PREVIEW_META = {json.dumps(meta)};</script>\n'
+            + PREVIEW_SCRIPT +
+            '</body>\n'
+            '</html>'
+        )
+
+    def close(self):
+        """Дописывает последний чанк, индекс поиска и страницу"""
+        self._flush()
+        lower = [name.lower() for name in self.names]
+        order = sorted(range(len(lower)), key=lower.__getitem__)
+        self._script(os.path.join(self.data_dir, 'search.js'), 'previewSearch', '\n'.join(self.names), order)
+        with OutputWriter.open(self.output_file) as f:
+            f.write(self._shell())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+    @staticmethod
+    def write(pairs, output_file, selector_type, method, chunk_size=None):
+        """Превью для пар (селектор, цвет); возвращает количество селекторов"""
+        with HtmlPreview(output_file, selector_type, method, chunk_size) as preview:
+            for selector, rgb in pairs:
+                preview.add(selector, rgb)
+        return len(preview.names)
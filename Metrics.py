@@ -0,0 +1,163 @@
+"""
+Замеры этапов, счётчики и пиковая память
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from config import Config
+
+
+class _Span:
+    """Замер одного этапа (контекстный менеджер)"""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        Metrics._record_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    """Пустой замер, когда метрики выключены"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Metrics:
+    """
+    Лёгкая инструментовка вместо print-прогресса
+
+    Включается через Config.METRICS_ENABLED, сообщения - через Config.VERBOSE
+    (по умолчанию обе выключены: тихий режим). Выключенный span - это
+    один общий пустой контекстный менеджер, счётчик - одна проверка флага.
+    Экспорт - JSON или текстовый формат Prometheus (*.prom).
+    """
+
+    PREFIX = 'screencolorizer'
+
+    spans = {}      # имя -> {'count', 'total', 'max'}
+    counters = {}   # имя -> значение
+    gauges = {}     # имя -> значение
+
+    @staticmethod
+    def log(message=''):
+        """Сообщение о ходе работы (только в режиме Config.VERBOSE)"""
+        if Config.VERBOSE:
+            print(message)
+
+    @staticmethod
+    def span(name):
+        """Замер этапа: with Metrics.span('extract'): ..."""
+        if not Config.METRICS_ENABLED:
+            return _NO_SPAN
+        if Config.METRICS_TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return _Span(name)
+
+    @classmethod
+    def _record_span(cls, name, elapsed):
+        stat = cls.spans.get(name)
+        if stat is None:
+            stat = cls.spans[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+        stat['count'] += 1
+        stat['total'] += elapsed
+        stat['max'] = max(stat['max'], elapsed)
+
+    @classmethod
+    def count(cls, name, value=1):
+        """Увеличить счётчик"""
+        if Config.METRICS_ENABLED:
+            cls.counters[name] = cls.counters.get(name, 0) + value
+
+    @classmethod
+    def gauge(cls, name, value):
+        """Записать текущее значение"""
+        if Config.METRICS_ENABLED:
+            cls.gauges[name] = value
+
+    @classmethod
+    def reset(cls):
+        cls.spans.clear()
+        cls.counters.clear()
+        cls.gauges.clear()
+
+    @staticmethod
+    def peak_memory():
+        """Пиковая память процесса в байтах (tracemalloc, если включён, иначе RSS)"""
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[1]
+        try:
+            import resource
+        except ImportError:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux отдаёт килобайты, macOS - байты
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    @classmethod
+    def snapshot(cls):
+        return {
+            'spans': {name: dict(stat) for name, stat in cls.spans.items()},
+            'counters': dict(cls.counters),
+            'gauges': dict(cls.gauges),
+            'peak_memory_bytes': cls.peak_memory(),
+        }
+
+    @classmethod
+    def to_prometheus(cls):
+        """Текст в формате Prometheus exposition"""
+        p = cls.PREFIX
+        lines = [
+            f'# TYPE {p}_span_seconds_total counter',
+            *(f'{p}_span_seconds_total{{span="{name}"}} {stat["total"]:.9f}' for name, stat in cls.spans.items()),
+            f'# TYPE {p}_span_calls_total counter',
+            *(f'{p}_span_calls_total{{span="{name}"}} {stat["count"]}' for name, stat in cls.spans.items()),
+            f'# TYPE {p}_span_max_seconds gauge',
+            *(f'{p}_span_max_seconds{{span="{name}"}} {stat["max"]:.9f}' for name, stat in cls.spans.items()),
+        ]
+        for name, value in cls.counters.items():
+            lines += [f'# TYPE {p}_{name}_total counter', f'{p}_{name}_total {value}']
+        for name, value in cls.gauges.items():
+            lines += [f'# TYPE {p}_{name} gauge', f'{p}_{name} {value}']
+        peak = cls.peak_memory()
+        if peak is not None:
+            lines += [f'# TYPE {p}_peak_memory_bytes gauge', f'{p}_peak_memory_bytes {peak}']
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def export(cls, path=None):
+        """Записать метрики в файл (по умолчанию Config.METRICS_FILE): *.prom - Prometheus, иначе JSON"""
+        path = path or Config.METRICS_FILE
+        if not path or not Config.METRICS_ENABLED:
+            return None
+
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(cls.to_prometheus())
+            else:
+                json.dump(cls.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
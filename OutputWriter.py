@@ -0,0 +1,36 @@
+"""
+Буферизованная запись выходных файлов (с опциональным gzip)
+"""
+import gzip
+import os
+
+BUFFER_SIZE = 256 * 1024
+
+
+class OutputWriter:
+
+    @staticmethod
+    def resolve_path(path, compress=False):
+        """Итоговый путь файла: при сжатии добавляется расширение .gz"""
+        if compress and not path.endswith('.gz'):
+            return path + '.gz'
+        return path
+
+    @staticmethod
+    def open(path, compress=False):
+        """
+        Открывает текстовый файл для потоковой записи
+
+        Запись идёт через большой буфер, так что writelines() по генератору
+        превращается в редкие крупные системные вызовы. Файлы *.gz
+        (или при compress=True) сжимаются на лету.
+        """
+        path = OutputWriter.resolve_path(path, compress)
+
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        if path.endswith('.gz'):
+            return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+        return open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
@@ -0,0 +1,130 @@
+"""
+Дисковый кэш сгенерированных палитр
+"""
+import hashlib
+import importlib.util
+import json
+import os
+
+# Увеличить при изменениях, которые меняют палитры, но не затрагивают
+# исходники модуля генератора и SHARED_MODULES
+CACHE_VERSION = 1
+
+# Модули, общие для генераторов: выборка кандидатов, цветовые пространства, расстояния
+SHARED_MODULES = ('ColorSampler', 'ColorSpace', 'ColorDistance')
+
+
+class PaletteCache:
+    """
+    Кэш палитр на диске с вытеснением по LRU
+
+    Палитра хранится в отдельном файле как n * 3 байта (r, g, b) без заголовков.
+    Ключ - хэш от (функция, n, параметры, версия кода). Время последнего
+    обращения - mtime файла, при превышении max_bytes удаляются самые старые.
+    """
+
+    EXT = '.rgb'
+
+    def __init__(self, cache_dir, max_bytes=16 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._code_versions = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, method, n):
+        """Ключ палитры: метод, n, параметры (включая seed) и версия кода"""
+        payload = {
+            'func': method.func_path,
+            'n': n,
+            'params': method.params,
+            'version': CACHE_VERSION,
+            'code': [self._code_version(name) for name in (method.module_name,) + SHARED_MODULES],
+        }
+        raw = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def _code_version(self, module_name):
+        """
+        Хэш исходника модуля - палитры устаревают при изменении генератора
+        или общих модулей (SHARED_MODULES)
+
+        Модуль ищется без импорта, так что попадание в кэш не загружает numpy.
+        """
+        if module_name not in self._code_versions:
+            spec = importlib.util.find_spec(module_name)
+            path = spec.origin if spec else None
+            digest = ''
+            if path and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+            self._code_versions[module_name] = digest
+        return self._code_versions[module_name]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.EXT)
+
+    def get(self, key):
+        """Вернуть палитру из кэша или None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        # Обновляем время обращения для LRU; файл мог вытеснить
+        # другой процесс (пакетный воркер, сервис) - данные уже прочитаны
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return [tuple(data[i:i + 3]) for i in range(0, len(data), 3)]
+
+    def put(self, key, colors):
+        """Сохранить палитру в кэш"""
+        data = bytes(c for rgb in colors for c in rgb)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self._evict()
+
+    def get_or_generate(self, method, n):
+        """Палитра из кэша, а при промахе - сгенерировать и сохранить"""
+        key = self.make_key(method, n)
+        colors = self.get(key)
+        if colors is None:
+            colors = [tuple(int(c) for c in rgb) for rgb in method.generate(n)]
+            self.put(key, colors)
+        return colors
+
+    def _evict(self):
+        """Удалить давно не использованные палитры сверх лимита размера"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(self.EXT):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        """Счётчики попаданий и промахов"""
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,247 @@
+"""
+Области селекторов на раскрашенных скриншотах
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ScreenshotDecoder import ScreenshotDecoder
+from TreeBuilder import SelectorTrie
+
+
+def _runs(band):
+    """
+    Горизонтальные отрезки одного значения в полосе (H, W)
+
+    Возвращает (строка, начало, конец, значение), отрезки упорядочены
+    по строкам и столбцам; в каждой строке они покрывают её целиком.
+    """
+    height, width = band.shape
+    change = np.empty((height, width), dtype=bool)
+    change[:, 0] = True
+    np.not_equal(band[:, 1:], band[:, :-1], out=change[:, 1:])
+
+    rows, starts = np.nonzero(change)
+    flat_start = rows * width + starts
+    flat_end = np.empty_like(flat_start)
+    flat_end[:-1] = flat_start[1:] - 1
+    flat_end[-1] = height * width - 1
+
+    return rows, starts, flat_end - rows * width, band[rows, starts]
+
+
+def _overlaps(starts_a, ends_a, starts_b, ends_b):
+    """
+    Пары (i, j) пересекающихся по столбцам отрезков двух строк
+
+    Отрезки каждой строки покрывают её целиком и упорядочены, поэтому
+    каждому отрезку b соответствует непрерывный диапазон отрезков a.
+    """
+    first = np.searchsorted(ends_a, starts_b)
+    last = np.searchsorted(starts_a, ends_b, side='right') - 1
+    counts = last - first + 1
+
+    b = np.repeat(np.arange(len(starts_b)), counts)
+    a = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return a, b
+
+
+def _connect(a, b, size):
+    """Метки связных компонент графа из size вершин и рёбер (a, b)"""
+    labels = np.arange(size)
+    while len(a):
+        la = labels[a]
+        lb = labels[b]
+        differ = la != lb
+        if not differ.any():
+            break
+        a, b, la, lb = a[differ], b[differ], la[differ], lb[differ]
+        # Подвешиваем больший корень к меньшему и сжимаем пути
+        np.minimum.at(labels, np.maximum(la, lb), np.minimum(la, lb))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+
+def _analyze_band(band, no_selector):
+    """
+    Статистика одной полосы: по селекторам (площадь, рамка, число компонент)
+    и отрезки верхней и нижней строк с номерами компонент для склейки полос
+    """
+    band = np.asarray(band)
+    height, width = band.shape
+    rows, starts, ends, values = _runs(band)
+
+    # Связность (4-соседство) между отрезками соседних строк внутри полосы
+    # (в сквозных координатах строка r - 1 для отрезка строки r - это сдвиг на -width)
+    below = np.searchsorted(rows, 1)
+    flat_starts = rows * width + starts
+    flat_ends = rows * width + ends
+    a, b = _overlaps(flat_starts, flat_ends, flat_starts[below:] - width, flat_ends[below:] - width)
+    b = b + below
+    same = (values[a] == values[b]) & (values[a] != no_selector)
+    labels = _connect(a[same], b[same], len(rows))
+
+    valid = values != no_selector
+    components, component_of = np.unique(labels, return_inverse=True)
+    component_value = values[components]
+
+    # Агрегаты по селекторам: сортируем отрезки по значению и сворачиваем
+    order = np.argsort(values[valid], kind='stable')
+    v = values[valid][order]
+    r = rows[valid][order]
+    s = starts[valid][order]
+    e = ends[valid][order]
+    selectors, first = np.unique(v, return_index=True)
+    if len(selectors):
+        area = np.add.reduceat(e - s + 1, first)
+        y0 = np.minimum.reduceat(r, first)
+        y1 = np.maximum.reduceat(r, first)
+        x0 = np.minimum.reduceat(s, first)
+        x1 = np.maximum.reduceat(e, first)
+    else:
+        area = y0 = y1 = x0 = x1 = np.empty(0, dtype=np.int64)
+
+    real = component_value != no_selector
+    comp_selectors, comp_counts = np.unique(component_value[real], return_counts=True)
+
+    def edge(mask):
+        return starts[mask], ends[mask], values[mask], component_of[mask]
+
+    return {
+        'selectors': selectors, 'area': area, 'y0': y0, 'y1': y1, 'x0': x0, 'x1': x1,
+        'comp_selectors': comp_selectors, 'comp_counts': comp_counts,
+        'components': len(components),
+        'top': edge(rows == 0),
+        'bottom': edge(rows == height - 1),
+    }
+
+
+class RegionAnalyzer:
+    """
+    Рамки, площади и связные области селекторов по картам индексов
+
+    Карта (H, W) из ScreenshotDecoder.decode обрабатывается полосами
+    по band_rows строк: полосы анализируются параллельно в пуле потоков
+    (не больше 2 * workers полос в памяти), а затем последовательно
+    склеиваются по граничным строкам. Подходит для memmap-кадров и
+    сколь угодно длинных последовательностей кадров.
+    """
+
+    NO_SELECTOR = ScreenshotDecoder.NO_SELECTOR
+
+    def __init__(self, selectors, band_rows=256, workers=4):
+        """selectors - имена селекторов по индексам палитры (например, ScreenshotDecoder.selectors)"""
+        self.selectors = list(selectors)
+        self.band_rows = band_rows
+        self.workers = workers
+
+    def _band_results(self, index_map):
+        """Результаты полос по порядку, с ограниченным числом полос в работе"""
+        height = index_map.shape[0]
+        tops = iter(range(0, height, self.band_rows))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for top in tops:
+                pending.append(pool.submit(_analyze_band, index_map[top:top + self.band_rows], self.NO_SELECTOR))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def analyze(self, index_map):
+        """
+        Статистика кадра: {селектор: {'area', 'bbox': (x0, y0, x1, y1), 'components'}}
+
+        Рамка включает граничные пиксели, компоненты - по 4-соседству
+        """
+        size = len(self.selectors)
+        area = np.zeros(size, dtype=np.int64)
+        components = np.zeros(size, dtype=np.int64)
+        y0 = np.full(size, np.iinfo(np.int64).max)
+        x0 = np.full(size, np.iinfo(np.int64).max)
+        y1 = np.full(size, -1, dtype=np.int64)
+        x1 = np.full(size, -1, dtype=np.int64)
+
+        parent = {}
+
+        def find(x):
+            root = x
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while x != root:
+                parent[x], x = root, parent.get(x, x)
+            return root
+
+        top = 0
+        offset = 0
+        previous_bottom = None
+
+        for band in self._band_results(index_map):
+            sel = band['selectors']
+            area[sel] += band['area']
+            np.minimum.at(y0, sel, band['y0'] + top)
+            np.maximum.at(y1, sel, band['y1'] + top)
+            np.minimum.at(x0, sel, band['x0'])
+            np.maximum.at(x1, sel, band['x1'])
+            components[band['comp_selectors']] += band['comp_counts']
+
+            # Склейка с предыдущей полосой по границе
+            starts, ends, values, comps = band['top']
+            if previous_bottom is not None:
+                p_starts, p_ends, p_values, p_comps = previous_bottom
+                a, b = _overlaps(p_starts, p_ends, starts, ends)
+                same = (p_values[a] == values[b]) & (values[b] != self.NO_SELECTOR)
+                for ga, gb, value in zip(p_comps[a[same]].tolist(), (comps[b[same]] + offset).tolist(),
+                                         values[b[same]].tolist()):
+                    ra, rb = find(ga), find(gb)
+                    if ra != rb:
+                        parent[max(ra, rb)] = min(ra, rb)
+                        components[value] -= 1
+
+            starts, ends, values, comps = band['bottom']
+            previous_bottom = (starts, ends, values, comps + offset)
+            offset += band['components']
+            top += self.band_rows
+
+        present = np.nonzero(area)[0]
+        return {
+            self.selectors[i]: {
+                'area': int(area[i]),
+                'bbox': (int(x0[i]), int(y0[i]), int(x1[i]), int(y1[i])),
+                'components': int(components[i]),
+            }
+            for i in present
+        }
+
+    def analyze_frames(self, frames):
+        """Потоковая обработка последовательности кадров: выдаёт статистику каждого"""
+        for index_map in frames:
+            yield self.analyze(index_map)
+
+    @staticmethod
+    def check_hierarchy(stats, trie):
+        """
+        Сверка с деревом TreeBuilder: рамка дочернего селектора должна
+        лежать внутри рамки родительского. Возвращает нарушения
+        [(родитель, ребёнок)] для пар, найденных на кадре
+        """
+        violations = set()
+        for node in range(1, len(trie) + 1):
+            parent = trie.parent[node]
+            if parent == SelectorTrie.ROOT:
+                continue
+            outer = stats.get(trie.name(parent))
+            inner = stats.get(trie.name(node))
+            if not outer or not inner:
+                continue
+            ox0, oy0, ox1, oy1 = outer['bbox']
+            ix0, iy0, ix1, iy1 = inner['bbox']
+            if ix0 < ox0 or iy0 < oy0 or ix1 > ox1 or iy1 > oy1:
+                violations.add((trie.name(parent), trie.name(node)))
+        return sorted(violations)
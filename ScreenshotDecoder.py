@@ -0,0 +1,168 @@
+"""
+Декодирование раскрашенных скриншотов обратно в селекторы
+"""
+import json
+import re
+
+import numpy as np
+
+from ColorSpace import ColorSpace
+
+CSS_RULE_PATTERN = re.compile(r'([#.])([a-zA-Z0-9_-]+)\s*\{\s*background-color:\s*rgb\((\d+),\s*(\d+),\s*(\d+)\)')
+
+
+class ScreenshotDecoder:
+    """
+    Таблица ближайших цветов палитры: RGB -> индекс селектора
+
+    Таблица строится один раз для всех 2^(3*bits) квантованных RGB
+    (bits=8 - полная таблица 256³, 32 МБ) по расстоянию в OKLab и может
+    храниться на диске и открываться через mmap. Декодирование кадра -
+    один векторный проход: упаковка RGB в индекс и выборка из таблицы.
+    """
+
+    NO_SELECTOR = 0xFFFF
+    CHUNK_SIZE = 1 << 16
+    DECODE_ROWS = 32
+
+    def __init__(self, pairs, bits=6, max_distance=None, lut=None):
+        """
+        pairs - пары (селектор, (r, g, b)), как возвращает SelectorColorMapper.generate_css
+        max_distance - пиксели дальше этого расстояния в OKLab от всех цветов
+        палитры получают NO_SELECTOR (фон, сглаживание)
+        """
+        if not 1 <= bits <= 8:
+            raise ValueError("bits должно быть от 1 до 8")
+
+        pairs = list(pairs)
+        if len(pairs) >= self.NO_SELECTOR:
+            raise ValueError(f"Слишком много селекторов для таблицы: {len(pairs)}")
+
+        self.selectors = [selector for selector, _ in pairs]
+        self.palette = np.array([rgb for _, rgb in pairs], dtype=np.uint8).reshape(-1, 3)
+        self.bits = bits
+        self.max_distance = max_distance
+        self.lut = lut if lut is not None else self._build_lut()
+
+    def _build_lut(self):
+        """Ближайший цвет палитры для центра каждой ячейки квантованного RGB"""
+        bits = self.bits
+        shift = 8 - bits
+        size = 1 << (3 * bits)
+        lut = np.empty(size, dtype=np.uint16)
+
+        if len(self.palette) == 0:
+            lut.fill(self.NO_SELECTOR)
+            return lut
+
+        # ||x - p||² = ||x||² - 2 x·p + ||p||², ||x||² для argmin не нужен
+        palette_lab = ColorSpace.rgb_to_oklab(self.palette)
+        palette_sq = (palette_lab ** 2).sum(axis=1)
+        mask = (1 << bits) - 1
+        center = (1 << shift) // 2
+
+        for start in range(0, size, self.CHUNK_SIZE):
+            idx = np.arange(start, min(start + self.CHUNK_SIZE, size))
+            rgb = np.stack([(idx >> (2 * bits)) & mask, (idx >> bits) & mask, idx & mask], axis=1)
+            lab = ColorSpace.rgb_to_oklab((rgb << shift) + center)
+
+            dist = palette_sq - 2 * (lab @ palette_lab.T)
+            nearest = np.argmin(dist, axis=1)
+
+            if self.max_distance is not None:
+                best = dist[np.arange(len(idx)), nearest] + (lab ** 2).sum(axis=1)
+                nearest = np.where(best > self.max_distance ** 2, self.NO_SELECTOR, nearest)
+
+            lut[start:start + len(idx)] = nearest
+
+        # Точные цвета палитры всегда попадают в свой селектор
+        exact = self._pack(self.palette)
+        lut[exact] = np.arange(len(self.palette), dtype=np.uint16)
+
+        return lut
+
+    def _pack(self, rgb):
+        """Индекс в таблице для массива (..., 3) uint8"""
+        shift = 8 - self.bits
+        rgb = np.asarray(rgb, dtype=np.uint32) >> shift
+        return (rgb[..., 0] << (2 * self.bits)) | (rgb[..., 1] << self.bits) | rgb[..., 2]
+
+    def decode(self, image):
+        """
+        Карта индексов селекторов (H, W) uint16 для кадра (H, W, 3|4) uint8
+
+        NO_SELECTOR - пиксель не относится ни к одному селектору
+        """
+        image = np.asarray(image)
+        if image.ndim != 3 or image.shape[2] not in (3, 4):
+            raise ValueError(f"Ожидается кадр (H, W, 3) или (H, W, 4), получено {image.shape}")
+
+        height, width = image.shape[:2]
+        bits = self.bits
+        shift = 8 - bits
+        rows = self.DECODE_ROWS
+
+        # Построчными полосами: временные массивы остаются в кэше процессора
+        result = np.empty((height, width), dtype=np.uint16)
+        idx = np.empty((rows, width), dtype=np.uint32)
+        tmp = np.empty((rows, width), dtype=np.uint32)
+
+        for top in range(0, height, rows):
+            band = image[top:top + rows]
+            i = idx[:len(band)]
+            t = tmp[:len(band)]
+
+            np.right_shift(band[..., 0], shift, out=i, casting='unsafe')
+            np.left_shift(i, 2 * bits, out=i)
+            np.right_shift(band[..., 1], shift, out=t, casting='unsafe')
+            np.left_shift(t, bits, out=t)
+            np.bitwise_or(i, t, out=i)
+            np.right_shift(band[..., 2], shift, out=t, casting='unsafe')
+            np.bitwise_or(i, t, out=i)
+
+            np.take(self.lut, i, out=result[top:top + len(band)])
+
+        return result
+
+    def selector(self, index):
+        """Имя селектора по индексу (None для NO_SELECTOR)"""
+        return None if index == self.NO_SELECTOR else self.selectors[index]
+
+    def save(self, path):
+        """Сохраняет таблицу (.npy) и палитру (path + '.json')"""
+        np.save(path, self.lut)
+        meta = {
+            'bits': self.bits,
+            'max_distance': self.max_distance,
+            'selectors': self.selectors,
+            'palette': self.palette.tolist(),
+        }
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @staticmethod
+    def load(path):
+        """Открывает сохранённую таблицу через mmap (без построения)"""
+        with open(path + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        lut = np.load(path if path.endswith('.npy') else path + '.npy', mmap_mode='r')
+        pairs = zip(meta['selectors'], (tuple(rgb) for rgb in meta['palette']))
+        return ScreenshotDecoder(pairs, meta['bits'], meta['max_distance'], lut=lut)
+
+    @staticmethod
+    def read_css(css_file):
+        """Пары (селектор с префиксом, (r, g, b)) из CSS, сгенерированного SelectorColorMapper"""
+        with open(css_file, 'r', encoding='utf-8') as f:
+            text = f.read()
+        return [(prefix + name, (int(r), int(g), int(b)))
+                for prefix, name, r, g, b in CSS_RULE_PATTERN.findall(text)]
+
+    @staticmethod
+    def load_image(path):
+        """Кадр из файла в массив (H, W, 3) uint8 (нужен Pillow)"""
+        # Pillow нужен только здесь - импортируем лениво
+        from PIL import Image
+
+        with Image.open(path) as img:
+            return np.asarray(img.convert('RGB'))
@@ -1,63 +1,146 @@
 """
 Генерация CSS и HTML с цветами
 """
+from contextlib import contextmanager
+
+from HtmlPreview import HtmlPreview
+from OutputWriter import OutputWriter
+
+HTML_STYLE = '''    <style>
+        body { font-family: Arial; padding: 20px; background: #f5f5f5; }
+        h1 { text-align: center; color: #333; }
+        .method { text-align: center; color: #666; margin: 20px; }
+        .grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(150px, 1fr)); gap: 15px; }
+        .card { border: 1px solid #ddd; border-radius: 8px; overflow: hidden; background: white; }
+        .color { height: 100px; display: flex; align-items: center; justify-content: center; color: white; font-size: 11px; }
+        .name { padding: 10px; text-align: center; font-family: monospace; font-size: 13px; }
+    </style>
+'''
+
+HTML_FOOTER = '''    </div>
+</body>
+</html>'''
 
 
 class SelectorColorMapper:
-    
+
     @staticmethod
-    def generate_css(selectors, output_file, selector_type, method):
-        """Генерирует CSS файл"""
+    def _prefix(selector_type):
+        return '#' if selector_type == 'id' else '.'
+
+    @staticmethod
+    def palette(selectors, method, cache=None):
+        """Палитра для списка селекторов (из кэша, если он передан)"""
         n = len(selectors)
-        colors = method.func(n)
-        
-        prefix = '#' if selector_type == 'id' else '.'
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(f'/* Метод: {method.description} */\n\n')
-            
-            for selector, (r, g, b) in zip(selectors, colors):
-                f.write(f'{prefix}{selector} {{\n')
-                f.write(f'    background-color: rgb({r}, {g}, {b});\n')
-                f.write(f'}}\n\n')
-        
+        return cache.get_or_generate(method, n) if cache else method.generate(n)
+
+    @staticmethod
+    def css_header(method):
+        return f'/* Метод: {method.description} */\n\n'
+
+    @staticmethod
+    def css_block(prefix, selector, rgb):
+        r, g, b = rgb
+        return f'{prefix}{selector} {{\n    background-color: rgb({r}, {g}, {b});\n}}\n\n'
+
+    @staticmethod
+    def html_header(selector_type, method):
+        return (
+            '<!DOCTYPE html>\n'
+            '<html lang="ru">\n'
+            '<head>\n'
+            '    <meta charset="UTF-8">\n'
+            f'    <title>Цвета {selector_type}</title>\n'
+            + HTML_STYLE +
+            '</head>\n'
+            '<body>\n'
+            f'    <h1>🎨 {selector_type.upper()} селекторы</h1>\n'
+            f'    <div class="method">{method.description}</div>\n'
+            '    <div class="grid">\n'
+        )
+
+    @staticmethod
+    def html_card(prefix, selector, rgb):
+        r, g, b = rgb
+        color_str = f'rgb({r}, {g}, {b})'
+        return (
+            '        <div class="card">\n'
+            f'            <div class="color" style="background-color: {color_str};">{color_str}</div>\n'
+            f'            <div class="name">{prefix}{selector}</div>\n'
+            '        </div>\n'
+        )
+
+    @staticmethod
+    def generate_css(selectors, output_file, selector_type, method, cache=None, colors=None, compress=False):
+        """
+        Генерирует CSS файл
+
+        Палитра берётся из colors, если она уже готова, иначе из кэша
+        (если он передан) или генерируется методом
+        """
+        if colors is None:
+            colors = SelectorColorMapper.palette(selectors, method, cache)
+
+        prefix = SelectorColorMapper._prefix(selector_type)
+        block = SelectorColorMapper.css_block
+
+        with OutputWriter.open(output_file, compress) as f:
+            f.write(SelectorColorMapper.css_header(method))
+            f.writelines(block(prefix, selector, rgb) for selector, rgb in zip(selectors, colors))
+
         return list(zip(selectors, colors))
 
     @staticmethod
-    def generate_html(pairs, output_file, selector_type, method):
-        """Генерирует HTML таблицу"""
-        prefix = '#' if selector_type == 'id' else '.'
-        
-        html = '<!DOCTYPE html>\n'
-        html += '<html lang="ru">\n'
-        html += '<head>\n'
-        html += '    <meta charset="UTF-8">\n'
-        html += f'    <title>Цвета {selector_type}</title>\n'
-        html += '    <style>\n'
-        html += '        body { font-family: Arial; padding: 20px; background: #f5f5f5; }\n'
-        html += '        h1 { text-align: center; color: #333; }\n'
-        html += '        .method { text-align: center; color: #666; margin: 20px; }\n'
-        html += '        .grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(150px, 1fr)); gap: 15px; }\n'
-        html += '        .card { border: 1px solid #ddd; border-radius: 8px; overflow: hidden; background: white; }\n'
-        html += '        .color { height: 100px; display: flex; align-items: center; justify-content: center; color: white; font-size: 11px; }\n'
-        html += '        .name { padding: 10px; text-align: center; font-family: monospace; font-size: 13px; }\n'
-        html += '    </style>\n'
-        html += '</head>\n'
-        html += '<body>\n'
-        html += f'    <h1>🎨 {selector_type.upper()} селекторы</h1>\n'
-        html += f'    <div class="method">{method.description}</div>\n'
-        html += '    <div class="grid">\n'
-        
-        for selector, (r, g, b) in pairs:
-            color_str = f'rgb({r}, {g}, {b})'
-            html += '        <div class="card">\n'
-            html += f'            <div class="color" style="background-color: {color_str};">{color_str}</div>\n'
-            html += f'            <div class="name">{prefix}{selector}</div>\n'
-            html += '        </div>\n'
-        
-        html += '    </div>\n'
-        html += '</body>\n'
-        html += '</html>'
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
\ No newline at end of file
+    @contextmanager
+    def _cards(html_file, selector_type, method, compress=False, virtual=False):
+        """
+        Приёмник карточек (селектор, цвет) для HTML
+
+        virtual - страница-оболочка с чанками данных (HtmlPreview)
+        вместо карточки на каждый селектор
+        """
+        if virtual:
+            with HtmlPreview(OutputWriter.resolve_path(html_file, compress), selector_type, method) as preview:
+                yield preview.add
+            return
+
+        prefix = SelectorColorMapper._prefix(selector_type)
+        card = SelectorColorMapper.html_card
+        with OutputWriter.open(html_file, compress) as html:
+            html.write(SelectorColorMapper.html_header(selector_type, method))
+            yield lambda selector, rgb: html.write(card(prefix, selector, rgb))
+            html.write(HTML_FOOTER)
+
+    @staticmethod
+    def generate_html(pairs, output_file, selector_type, method, compress=False, virtual=False):
+        """Генерирует HTML таблицу (или виртуализированное превью)"""
+        with SelectorColorMapper._cards(output_file, selector_type, method, compress, virtual) as add_card:
+            for selector, rgb in pairs:
+                add_card(selector, rgb)
+
+    @staticmethod
+    def generate(selectors, css_file, html_file, selector_type, method,
+                 cache=None, colors=None, compress=False, virtual=False):
+        """
+        Генерирует CSS и HTML за один проход по парам (селектор, цвет)
+
+        Пары не накапливаются в памяти - оба файла пишутся потоково.
+        virtual - HTML в виде виртуализированного превью (HtmlPreview).
+        Возвращает количество записанных селекторов
+        """
+        if colors is None:
+            colors = SelectorColorMapper.palette(selectors, method, cache)
+
+        prefix = SelectorColorMapper._prefix(selector_type)
+        count = 0
+
+        with OutputWriter.open(css_file, compress) as css, \
+                SelectorColorMapper._cards(html_file, selector_type, method, compress, virtual) as add_card:
+            css.write(SelectorColorMapper.css_header(method))
+
+            for selector, rgb in zip(selectors, colors):
+                css.write(SelectorColorMapper.css_block(prefix, selector, rgb))
+                add_card(selector, rgb)
+                count += 1
+
+        return count
@@ -1,22 +1,118 @@
+import glob
+import mmap
+import os
 import re
 
+from Metrics import Metrics
+
+# Один шаблон на ID (#) и классы (.) - имя не может содержать ни '#', ни '.',
+# поэтому совпадения не пересекаются и результат тот же, что у двух отдельных
+SELECTOR_PATTERN = re.compile(rb'([#.])([a-zA-Z0-9_-]+)')
+
+# Файлы больше порога сканируются через mmap, меньше - блоками
+MMAP_THRESHOLD = 8 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+
 
 class SelectorExtractor:
     @staticmethod
-    def extract_ids(file_path):
+    def expand_inputs(inputs):
         """
-        Извлекает все уникальные ID селекторы (с #) из файла
-        и возвращает их список без символа #
+        Раскрывает входы в список файлов: принимает путь, директорию
+        (обходится рекурсивно) или glob-шаблон, либо список таких значений
+        """
+        if isinstance(inputs, (str, os.PathLike)):
+            inputs = [inputs]
+
+        files = []
+        for item in inputs:
+            item = os.fspath(item)
+            if os.path.isdir(item):
+                for root, dirs, names in os.walk(item):
+                    dirs.sort()
+                    files.extend(os.path.join(root, name) for name in sorted(names))
+            elif glob.has_magic(item):
+                files.extend(p for p in sorted(glob.glob(item, recursive=True)) if os.path.isfile(p))
+            else:
+                files.append(item)
+        return files
+
+    @staticmethod
+    def _iter_matches(file_path):
+        """Поток пар (b'#' | b'.', имя в байтах) из одного файла"""
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for match in SELECTOR_PATTERN.finditer(mm):
+                        yield match.groups()
+                return
+
+            # Блоки режем по последнему переводу строки, чтобы не разорвать имя
+            tail = b''
+            while True:
+                block = f.read(BLOCK_SIZE)
+                if not block:
+                    break
+                block = tail + block
+                cut = block.rfind(b'\n') + 1
+                tail = block[cut:]
+                yield from SELECTOR_PATTERN.findall(block, 0, cut)
+            if tail:
+                yield from SELECTOR_PATTERN.findall(tail)
+
+    @staticmethod
+    def iter_selectors(inputs):
+        """
+        Один потоковый проход по входам: выдаёт пары ('id' | 'class', имя)
+        в порядке появления (с повторами)
+        """
+        for file_path in SelectorExtractor.expand_inputs(inputs):
+            for kind, name in SelectorExtractor._iter_matches(file_path):
+                yield ('id' if kind == b'#' else 'class'), name.decode('ascii')
+
+    @staticmethod
+    def extract(inputs):
+        """
+        Извлекает уникальные ID и class селекторы за один проход
+        и возвращает два отсортированных списка без символов # и .
         """
+        return SelectorExtractor._collect(
+            match
+            for file_path in SelectorExtractor.expand_inputs(inputs)
+            for match in SelectorExtractor._iter_matches(file_path)
+        )
+
+    @staticmethod
+    def extract_bytes(data):
+        """То же, что extract, для дампа уже в памяти (bytes), без файлов"""
+        return SelectorExtractor._collect(SELECTOR_PATTERN.findall(data))
+
+    @staticmethod
+    def _collect(matches):
+        """Уникальные ID и классы из пар (b'#' | b'.', имя), отсортированные"""
         ids = set()
+        classes = set()
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                # Находим все селекторы, начинающиеся с #
-                matches = re.findall(r'#([a-zA-Z0-9_-]+)', line)
-                ids.update(matches)
+        for kind, name in matches:
+            if kind == b'#':
+                ids.add(name)
+            else:
+                classes.add(name)
 
-        return sorted(list(ids))
+        return (sorted(name.decode('ascii') for name in ids),
+                sorted(name.decode('ascii') for name in classes))
+
+    @staticmethod
+    def extract_ids(file_path):
+        """
+        Извлекает все уникальные ID селекторы (с #) из файла
+        и возвращает их список без символа #
+        """
+        return SelectorExtractor.extract(file_path)[0]
 
     @staticmethod
     def extract_classes(file_path):
@@ -24,15 +120,7 @@ class SelectorExtractor:
         Извлекает все уникальные class селекторы (с .) из файла
         и возвращает их список без символа .
         """
-        classes = set()
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                # Находим все селекторы, начинающиеся с .
-                matches = re.findall(r'\.([a-zA-Z0-9_-]+)', line)
-                classes.update(matches)
-
-        return sorted(list(classes))
+        return SelectorExtractor.extract(file_path)[1]
 
     @staticmethod
     def save_ids_to_file(input_file, output_file='ids.txt'):
@@ -45,8 +133,8 @@ class SelectorExtractor:
             for id_name in ids:
                 f.write(id_name + '\n')
 
-        print(f"✅ Найдено {len(ids)} уникальных ID селекторов")
-        print(f"📄 Сохранено в файл: {output_file}")
+        Metrics.log(f"✅ Найдено {len(ids)} уникальных ID селекторов")
+        Metrics.log(f"📄 Сохранено в файл: {output_file}")
 
         return ids
 
@@ -61,7 +149,7 @@ class SelectorExtractor:
             for class_name in classes:
                 f.write(class_name + '\n')
 
-        print(f"✅ Найдено {len(classes)} уникальных class селекторов")
-        print(f"📄 Сохранено в файл: {output_file}")
+        Metrics.log(f"✅ Найдено {len(classes)} уникальных class селекторов")
+        Metrics.log(f"📄 Сохранено в файл: {output_file}")
 
-        return classes
\ No newline at end of file
+        return classes
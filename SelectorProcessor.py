@@ -1,23 +1,96 @@
 """
 Основной процессор
 """
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from SelectorExtractor import SelectorExtractor
 from SelectorColorMapper import SelectorColorMapper
+from HtmlPreview import HtmlPreview
+from OutputWriter import OutputWriter
+from PaletteCache import PaletteCache
+from ColorAssignment import ColorAssignment
+from TreeBuilder import TreeBuilder
+from BinaryExport import BinaryExport
+from TreeColoring import TreeColoring
+from TreeDiff import TreeDiff
+from Metrics import Metrics
 from config import Config
 
 
+def _extract_worker(input_file):
+    """Пакетный режим: извлечение селекторов одного файла (в процессе пула)"""
+    start = time.perf_counter()
+    ids, classes = SelectorExtractor.extract(input_file)
+    return ids, classes, time.perf_counter() - start
+
+
+def _generate_worker(method, n):
+    """Пакетный режим: генерация палитры для одного n (в процессе пула)"""
+    return [tuple(int(c) for c in rgb) for rgb in method.generate(n)]
+
+
+def _render_worker(task):
+    """
+    Пакетный режим: списки, CSS/HTML и дерево одного файла (в процессе пула)
+
+    Настройки приходят в задаче (SelectorProcessor._render_settings), а не
+    из Config: при spawn/forkserver изменения Config в родителе не видны
+    """
+    input_file, output_dir, method, groups, settings = task
+    timings = {}
+
+    start = time.perf_counter()
+    trie, _ = TreeBuilder.build(
+        input_file, os.path.join(output_dir, 'tree.txt'), os.path.join(output_dir, 'all_paths.txt')
+    )
+    timings['tree'] = time.perf_counter() - start
+
+    # В режиме ASSIGNMENT = 'tree' палитра своя у каждого файла - раскраской его дерева
+    if settings['assignment'] == 'tree':
+        groups = [
+            (selector_type, name, selectors,
+             TreeColoring.assign(selectors, selector_type, trie, method, strategy=settings['tree_coloring'])[0])
+            for selector_type, name, selectors, _ in groups
+        ]
+
+    start = time.perf_counter()
+    for selector_type, name, selectors, colors in groups:
+        SelectorProcessor._save_list(selectors, os.path.join(output_dir, 'txt', f'{name}.txt'))
+        SelectorColorMapper.generate(
+            selectors,
+            os.path.join(output_dir, 'css', f'selectors_{name}.css'),
+            os.path.join(output_dir, 'html', f'selectors_{name}.html'),
+            selector_type, method, colors=colors, compress=settings['compress'],
+            virtual=HtmlPreview.wanted(len(selectors), settings['html_preview'], settings['html_preview_threshold'])
+        )
+    timings['css_html'] = time.perf_counter() - start
+
+    if settings['binary_export']:
+        pairs = SelectorProcessor._export_pairs((selector_type, selectors, colors)
+                                                for selector_type, _, selectors, colors in groups)
+        BinaryExport.write(os.path.join(output_dir, 'scb', 'selectors.scb'), pairs, trie)
+
+    return timings
+
+
 class SelectorProcessor:
     """Обработка селекторов"""
     
     def __init__(self):
         self.config = Config
+        self.config.validate()
         self.method = self.config.get_method()
+        self.cache = None
+        self._trie = None
+        if self.config.CACHE_ENABLED:
+            self.cache = PaletteCache(self.config.CACHE_DIR, self.config.CACHE_MAX_BYTES)
         self._create_dirs()
         
     def _create_dirs(self):
         """Создать директории для выходных файлов"""
-        dirs = ['txt', 'css', 'html']
+        dirs = ['txt', 'css', 'html', 'scb', 'json']
         for d in dirs:
             os.makedirs(os.path.join(self.config.OUTPUT_DIR, d), exist_ok=True)
     
@@ -28,79 +101,301 @@ class SelectorProcessor:
     
     def process(self):
         """Главный метод обработки"""
+        # Настройки могли измениться после создания процессора
+        self.config.validate()
         input_file = self.config.INPUT_FILE
         
-        print("=" * 70)
-        print(f"🎨 ГЕНЕРАТОР ЦВЕТОВ")
-        print("=" * 70)
-        print(f"📂 Файл: {input_file}")
-        print(f"🎯 Метод: {self.config.COLOR_METHOD}")
-        print("=" * 70)
-        print()
+        Metrics.log("=" * 70)
+        Metrics.log(f"🎨 ГЕНЕРАТОР ЦВЕТОВ")
+        Metrics.log("=" * 70)
+        Metrics.log(f"📂 Файл: {input_file}")
+        Metrics.log(f"🎯 Метод: {self.config.COLOR_METHOD}")
+        Metrics.log(f"🌳 Назначение: {self.config.ASSIGNMENT}")
+        Metrics.log("=" * 70)
+        Metrics.log()
+
+        self._trie = None
+        
+        # Инкрементальный режим: прошлые цвета сохраняются, неизменный вход пропускается
+        assignment = None
+        if self.config.INCREMENTAL:
+            files = SelectorExtractor.expand_inputs(input_file)
+            assignment = ColorAssignment(self.config.STATE_FILE, self.config.COLOR_METHOD, self.method)
+            if assignment.inputs_unchanged(files):
+                Metrics.log("✅ Вход не изменился - результаты актуальны")
+                return
         
         # Извлечение селекторов
-        print("📋 Извлечение селекторов...")
-        ids = SelectorExtractor.extract_ids(input_file)
-        classes = SelectorExtractor.extract_classes(input_file)
+        Metrics.log("📋 Извлечение селекторов...")
+        with Metrics.span('extract'):
+            ids, classes = SelectorExtractor.extract(input_file)
+        Metrics.count('selectors', len(ids) + len(classes))
         
         if not ids and not classes:
-            print("⚠️ Селекторы не найдены!")
+            Metrics.log("⚠️ Селекторы не найдены!")
             return
         
         # Сохранение списков
         if ids:
             path = self._get_output_path('ids.txt')
             self._save_list(ids, path)
-            print(f"✅ ID селекторов: {len(ids)} → {path}")
+            Metrics.log(f"✅ ID селекторов: {len(ids)} → {path}")
         
         if classes:
             path = self._get_output_path('classes.txt')
             self._save_list(classes, path)
-            print(f"✅ Class селекторов: {len(classes)} → {path}")
+            Metrics.log(f"✅ Class селекторов: {len(classes)} → {path}")
         
-        print()
+        Metrics.log()
         
-        # Генерация CSS и HTML для ID
-        if ids:
-            print(f"🎨 Генерация для ID ({len(ids)} шт.)...")
-            
-            css_path = self._get_output_path('selectors_ids.css')
-            html_path = self._get_output_path('selectors_ids.html')
-            
-            pairs = SelectorColorMapper.generate_css(
-                ids, css_path, 'id', self.method
-            )
-            SelectorColorMapper.generate_html(
-                pairs, html_path, 'id', self.method
-            )
-            
-            print(f"   CSS:  {css_path}")
-            print(f"   HTML: {html_path}")
-            print()
-        
-        # Генерация CSS и HTML для classes
-        if classes:
-            print(f"🎨 Генерация для classes ({len(classes)} шт.)...")
-            
-            css_path = self._get_output_path('selectors_classes.css')
-            html_path = self._get_output_path('selectors_classes.html')
-            
-            pairs = SelectorColorMapper.generate_css(
-                classes, css_path, 'class', self.method
-            )
-            SelectorColorMapper.generate_html(
-                pairs, html_path, 'class', self.method
-            )
-            
-            print(f"   CSS:  {css_path}")
-            print(f"   HTML: {html_path}")
-            print()
+        unchanged = self._unchanged_types(input_file, assignment)
+        exported = []
+
+        # Генерация CSS и HTML для ID и classes
+        for selector_type, name, title, selectors in (('id', 'ids', 'ID', ids), ('class', 'classes', 'classes', classes)):
+            if not selectors:
+                continue
+            Metrics.log(f"🎨 Генерация для {title} ({len(selectors)} шт.)...")
+
+            compress = self.config.COMPRESS_OUTPUT
+            css_path = OutputWriter.resolve_path(self._get_output_path(f'selectors_{name}.css'), compress)
+            html_path = OutputWriter.resolve_path(self._get_output_path(f'selectors_{name}.html'), compress)
+
+            colors = assignment.known_colors(selector_type, selectors) if selector_type in unchanged else None
+            if colors is not None and os.path.exists(css_path) and os.path.exists(html_path):
+                Metrics.log("   Селекторы не изменились - CSS и HTML актуальны")
+            else:
+                colors = self._palette(selector_type, selectors, assignment, input_file)
+                with Metrics.span('css_html'):
+                    SelectorColorMapper.generate(
+                        selectors, css_path, html_path, selector_type, self.method, self.cache, colors,
+                        virtual=HtmlPreview.wanted(len(selectors), self.config.HTML_PREVIEW,
+                                                   self.config.HTML_PREVIEW_THRESHOLD)
+                    )
+            exported.append((selector_type, selectors, colors))
+
+            Metrics.log(f"   CSS:  {css_path}")
+            Metrics.log(f"   HTML: {html_path}")
+            Metrics.log()
         
-        print("=" * 70)
-        print("✅ Готово!")
-        print("=" * 70)
+        if self.config.BINARY_EXPORT:
+            path = self._get_output_path('selectors.scb')
+            trie = self._tree(input_file)
+            with Metrics.span('binary'):
+                BinaryExport.write(path, self._export_pairs(exported), trie)
+            Metrics.log(f"📦 Бинарный экспорт: {path}")
+            Metrics.log()
+
+        if assignment:
+            assignment.save(files)
+            Metrics.count('new_selectors', assignment.new_count)
+            Metrics.log(f"🔁 Новых селекторов: {assignment.new_count}, состояние: {self.config.STATE_FILE}")
+
+        if self.cache:
+            stats = self.cache.stats()
+            Metrics.count('cache_hits', stats['hits'])
+            Metrics.count('cache_misses', stats['misses'])
+            Metrics.log(f"💾 Кэш палитр: попаданий {stats['hits']}, промахов {stats['misses']}")
+
+        Metrics.log("=" * 70)
+        Metrics.log("✅ Готово!")
+        Metrics.log("=" * 70)
+
+        Metrics.export()
+
+    def _unchanged_types(self, input_file, assignment):
+        """
+        Инкрементальный режим: типы селекторов, CSS которых можно не перегенерировать
+
+        Старое дерево берётся из прошлого бинарного экспорта (без разбора),
+        разница с новым (TreeDiff) пишется в json/tree_diff.json. Тип
+        пропускается, если изменения дерева не затронули его селекторы
+        """
+        path = self._get_output_path('selectors.scb')
+        if not assignment or not self.config.BINARY_EXPORT or not os.path.exists(path):
+            return set()
+        try:
+            old = TreeDiff.load_tree(path)
+        except ValueError:
+            return set()
+
+        new = self._tree(input_file)
+        with Metrics.span('diff'):
+            try:
+                report = TreeDiff.diff(old, new)
+            finally:
+                old.close()
+
+        report_path = self._get_output_path('tree_diff.json')
+        TreeDiff.save(report, report_path)
+        Metrics.log(f"🌳 Разница деревьев: +{len(report['added'])} -{len(report['removed'])} "
+                    f"~{len(report['moved'])} ветвей → {report_path}")
+        return {'id', 'class'} - TreeDiff.changed_types(report)
+
+    def _tree(self, input_file):
+        """Дерево входа (строится один раз за обработку)"""
+        if self._trie is None:
+            self._trie, _ = TreeBuilder.build(input_file)
+        return self._trie
+
+    def _palette(self, selector_type, selectors, assignment, input_file):
+        """
+        Цвета группы селекторов: из состояния (инкрементально),
+        раскраской дерева (ASSIGNMENT = 'tree'), из кэша или методом
+        """
+        if self.config.ASSIGNMENT == 'tree':
+            trie = self._tree(input_file)
+            with Metrics.span('palette'):
+                colors, size = TreeColoring.assign(selectors, selector_type, trie, self.method, self.cache,
+                                                   self.config.TREE_COLORING)
+            Metrics.gauge(f'palette_size_{selector_type}', size)
+            Metrics.log(f"   Цветов в палитре: {size} (селекторов {len(selectors)})")
+            return colors
+
+        with Metrics.span('palette'):
+            if assignment:
+                return assignment.assign(selector_type, selectors, self.cache)
+            return SelectorColorMapper.palette(selectors, self.method, self.cache)
     
-    def _save_list(self, items, path):
+    def process_batch(self, input_dir, workers=None):
+        """
+        Пакетная обработка директории (или glob/списка) дампов в пуле процессов
+
+        Извлечение и генерация CSS/HTML/дерева идут параллельно по файлам,
+        палитра генерируется один раз на каждое различное n и раздаётся воркерам.
+        Результаты каждого файла - в BATCH_OUTPUT_DIR/<путь файла относительно общей директории входа>/,
+        сводка с временем по файлам - в BATCH_OUTPUT_DIR/batch_report.json
+        """
+        self.config.validate()
+        files = SelectorExtractor.expand_inputs(input_dir)
+        workers = workers or self.config.BATCH_WORKERS or os.cpu_count()
+        batch_dir = self.config.BATCH_OUTPUT_DIR
+        base_dir = self._batch_base_dir(input_dir, files)
+        settings = self._render_settings()
+
+        Metrics.log("=" * 70)
+        Metrics.log(f"🎨 ПАКЕТНАЯ ОБРАБОТКА: {len(files)} файлов, {workers} процессов")
+        Metrics.log("=" * 70)
+
+        total_start = time.perf_counter()
+        report = []
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # 1. Извлечение селекторов
+            chunksize = max(1, len(files) // (workers * 4))
+            extracted = list(pool.map(_extract_worker, files, chunksize=chunksize))
+
+            # 2. Палитры - один раз на каждое различное n (в режиме 'tree' - в воркерах по дереву)
+            sizes = set()
+            if self.config.ASSIGNMENT != 'tree':
+                sizes = {len(items) for ids, classes, _ in extracted for items in (ids, classes) if items}
+            with Metrics.span('palette'):
+                palettes = self._batch_palettes(pool, sizes)
+            Metrics.log(f"🎨 Палитр: {len(palettes)} (различных n)")
+
+            # 3. Списки, CSS/HTML и деревья
+            tasks = []
+            for input_file, (ids, classes, _) in zip(files, extracted):
+                output_dir = self._batch_output_dir(batch_dir, input_file, base_dir)
+                for d in ('txt', 'css', 'html'):
+                    os.makedirs(os.path.join(output_dir, d), exist_ok=True)
+                groups = [
+                    (selector_type, name, items, palettes.get(len(items)))
+                    for selector_type, name, items in (('id', 'ids', ids), ('class', 'classes', classes))
+                    if items
+                ]
+                tasks.append((input_file, output_dir, self.method, groups, settings))
+
+            rendered = pool.map(_render_worker, tasks, chunksize=chunksize)
+
+            for input_file, (ids, classes, extract_time), timings in zip(files, extracted, rendered):
+                report.append({
+                    'file': input_file,
+                    'ids': len(ids),
+                    'classes': len(classes),
+                    'extract': round(extract_time, 6),
+                    'css_html': round(timings['css_html'], 6),
+                    'tree': round(timings['tree'], 6),
+                })
+
+        total = time.perf_counter() - total_start
+        os.makedirs(batch_dir, exist_ok=True)
+        report_path = os.path.join(batch_dir, 'batch_report.json')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({'method': self.config.COLOR_METHOD, 'workers': workers,
+                       'total': round(total, 6), 'files': report}, f, ensure_ascii=False, indent=2)
+
+        Metrics.log(f"⏱️ Всего: {total:.2f} с, отчёт: {report_path}")
+        Metrics.log("=" * 70)
+
+        Metrics.export()
+        return report
+
+    def _batch_palettes(self, pool, sizes):
+        """Палитры для набора n: из кэша, а недостающие - параллельно в пуле"""
+        palettes = {}
+        missing = []
+        for n in sorted(sizes):
+            key = self.cache.make_key(self.method, n) if self.cache else None
+            colors = self.cache.get(key) if self.cache else None
+            if colors is None:
+                missing.append((n, key))
+            else:
+                palettes[n] = colors
+
+        futures = [(n, key, pool.submit(_generate_worker, self.method, n)) for n, key in missing]
+        for n, key, future in futures:
+            palettes[n] = future.result()
+            if self.cache:
+                self.cache.put(key, palettes[n])
+
+        return palettes
+
+    def _render_settings(self):
+        """Действующие настройки для _render_worker"""
+        return {
+            'assignment': self.config.ASSIGNMENT,
+            'tree_coloring': self.config.TREE_COLORING,
+            'compress': self.config.COMPRESS_OUTPUT,
+            'html_preview': self.config.HTML_PREVIEW,
+            'html_preview_threshold': self.config.HTML_PREVIEW_THRESHOLD,
+            'binary_export': self.config.BINARY_EXPORT,
+        }
+
+    @staticmethod
+    def _batch_base_dir(input_dir, files):
+        """
+        Директория, относительно которой строятся пути результатов
+
+        Для glob и списков - общий предок файлов, чтобы a/dump.txt и b/dump.txt
+        не попали в одну директорию результатов
+        """
+        if isinstance(input_dir, str) and os.path.isdir(input_dir):
+            return input_dir
+        if not files:
+            return None
+        return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+
+    @staticmethod
+    def _batch_output_dir(batch_dir, input_file, base_dir):
+        """
+        Директория результатов файла: путь относительно base_dir целиком
+
+        Расширение сохраняется (a.txt -> a.txt/), иначе a.txt и a.log или
+        файл b.txt и директория b/ попали бы в одну директорию результатов
+        """
+        name = os.path.relpath(os.path.abspath(input_file), os.path.abspath(base_dir))
+        return os.path.join(batch_dir, name)
+
+    @staticmethod
+    def _export_pairs(groups):
+        """Пары (селектор с префиксом, цвет) для BinaryExport из групп (тип, селекторы, цвета)"""
+        for selector_type, selectors, colors in groups:
+            prefix = SelectorColorMapper._prefix(selector_type)
+            yield from zip((prefix + selector for selector in selectors), colors)
+
+    @staticmethod
+    def _save_list(items, path):
         """Сохранить список в файл"""
         with open(path, 'w', encoding='utf-8') as f:
             for item in items:
@@ -1,168 +1,448 @@
 """
 Построение дерева из путей селекторов
 """
+import hashlib
 import os
+import sys
+from array import array
+
+from ExternalSort import ExternalSort
+from Metrics import Metrics
+from SelectorExtractor import SelectorExtractor
+from config import Config
+
+
+# Размер хэша поддерева (байт)
+HASH_SIZE = 16
+
+
+class SelectorTrie:
+    """
+    Компактное префиксное дерево компонентов путей
+
+    Узлы хранятся в массивах (array), а не во вложенных словарях:
+    у узла есть только индекс имени в таблице строк, родитель и глубина.
+    Имена компонентов интернируются и хранятся один раз.
+    Узел 0 - виртуальный корень, реальные корневые элементы - его дети.
+
+    Рёбра (родитель, имя) -> ребёнок нужны только при добавлении путей:
+    ключ упакован в одно целое, а после построения finish() освобождает
+    словарь (поиск пути идёт по спискам детей sibling_links).
+
+    Для запросов строится индекс (один раз, сбрасывается при добавлении
+    узлов): узлы каждого компонента и размеры поддеревьев. Поиск
+    вхождений - O(1) + O(k), размер поддерева - O(1), предки - O(глубины).
+    """
+
+    ROOT = 0
+
+    def __init__(self):
+        self.names = []                  # таблица строк компонентов
+        self._name_ids = {}              # имя -> индекс в таблице
+        self.node_name = array('i', [-1])
+        self.parent = array('i', [-1])
+        self.depth = array('i', [0])
+        self.child_count = array('i', [0])
+        self._edges = {}                 # родитель << 32 | индекс имени -> узел
+        self._links = None
+        self._index = None
+        self._hashes = None
+
+    def __len__(self):
+        """Количество узлов без виртуального корня"""
+        return len(self.parent) - 1
+
+    def intern(self, name):
+        """Индекс имени в таблице строк (добавляет при необходимости)"""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self._name_ids[name] = name_id
+            self.names.append(sys.intern(name))
+        return name_id
+
+    def add_path(self, components):
+        """Добавляет путь в дерево и возвращает его последний узел"""
+        if self._edges is None:
+            # После finish() словарь рёбер восстанавливается из массивов
+            self._edges = {parent << 32 | name_id: node
+                           for node, (parent, name_id) in enumerate(zip(self.parent, self.node_name)) if node}
+        edges = self._edges
+        node = self.ROOT
+        for comp in components:
+            name_id = self.intern(comp)
+            key = node << 32 | name_id
+            child = edges.get(key)
+            if child is None:
+                child = len(self.parent)
+                edges[key] = child
+                self.node_name.append(name_id)
+                self.parent.append(node)
+                self.depth.append(self.depth[node] + 1)
+                self.child_count.append(0)
+                self.child_count[node] += 1
+                self._links = None
+                self._index = None
+                self._hashes = None
+            node = child
+        return node
+
+    def finish(self):
+        """Освобождает словарь рёбер после построения (add_path восстановит его)"""
+        self._edges = None
+
+    def name(self, node):
+        return self.names[self.node_name[node]]
+
+    def sibling_links(self):
+        """
+        Массивы first_child / next_sibling, дети упорядочены по имени
+
+        Считаются один раз после построения (сбрасываются при добавлении узлов).
+        """
+        if self._links is None:
+            size = len(self.parent)
+            first_child = array('i', [-1]) * size
+            next_sibling = array('i', [-1]) * size
+
+            names = self.names
+            node_name = self.node_name
+            order = sorted(range(1, size), key=lambda i: names[node_name[i]])
+            # Идём с конца, чтобы первым ребёнком оказался наименьший по имени
+            for node in reversed(order):
+                p = self.parent[node]
+                next_sibling[node] = first_child[p]
+                first_child[p] = node
+
+            self._links = (first_child, next_sibling)
+        return self._links
+
+    def index(self):
+        """
+        Индекс дерева: (индекс имени -> array узлов, размеры поддеревьев)
+
+        Дети создаются позже родителя, поэтому размеры поддеревьев
+        считаются одним проходом от последнего узла к первому.
+        Размер поддерева включает сам узел, у корня - число всех узлов.
+        """
+        if self._index is None:
+            size = len(self.parent)
+            subtree = array('i', [1]) * size
+            parent = self.parent
+            for node in range(size - 1, 0, -1):
+                subtree[parent[node]] += subtree[node]
+            subtree[self.ROOT] -= 1
+
+            occurrences = {}
+            for node in range(1, size):
+                name_id = self.node_name[node]
+                nodes = occurrences.get(name_id)
+                if nodes is None:
+                    nodes = occurrences[name_id] = array('i')
+                nodes.append(node)
+
+            self._index = (occurrences, subtree)
+        return self._index
+
+    def subtree_hashes(self):
+        """
+        Хэши поддеревьев (Merkle): имя узла и хэши детей в порядке имён
+
+        Одинаковые поддеревья (с одинаковым именем корня) имеют одинаковый хэш,
+        поэтому при сравнении деревьев их можно пропускать, не обходя
+        """
+        if self._hashes is None:
+            first_child, next_sibling = self.sibling_links()
+            names = [name.encode('utf-8') + b'\x00' for name in self.names]
+            hashes = [b''] * len(self.parent)
+            for node in range(len(self.parent) - 1, -1, -1):
+                h = hashlib.blake2b(names[self.node_name[node]] if node else b'\x00', digest_size=HASH_SIZE)
+                child = first_child[node]
+                while child != -1:
+                    h.update(hashes[child])
+                    child = next_sibling[child]
+                hashes[node] = h.digest()
+            self._hashes = hashes
+        return self._hashes
+
+    def subtree_hash(self, node):
+        return self.subtree_hashes()[node]
+
+    def children(self, node=ROOT):
+        """Дети узла по порядку имён"""
+        first_child, next_sibling = self.sibling_links()
+        child = first_child[node]
+        while child != -1:
+            yield child
+            child = next_sibling[child]
+
+    def find(self, name):
+        """Все узлы компонента name (например, '#logo') в порядке добавления"""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            return array('i')
+        return self.index()[0][name_id]
+
+    def find_path(self, components):
+        """Узел пути от корня или -1"""
+        first_child, next_sibling = self.sibling_links()
+        node = self.ROOT
+        for comp in components:
+            name_id = self._name_ids.get(comp)
+            child = first_child[node] if name_id is not None else -1
+            while child != -1 and self.node_name[child] != name_id:
+                child = next_sibling[child]
+            node = child
+            if node == -1:
+                break
+        return node
+
+    def subtree_size(self, node):
+        """Количество узлов в поддереве (включая сам узел)"""
+        return self.index()[1][node]
+
+    def ancestors(self, node):
+        """Предки узла от родителя к корневому элементу"""
+        result = []
+        node = self.parent[node]
+        while node > self.ROOT:
+            result.append(node)
+            node = self.parent[node]
+        return result
+
+    def path(self, node):
+        """Компоненты пути от корня до узла"""
+        return [self.name(n) for n in reversed(self.ancestors(node))] + [self.name(node)]
+
+    def iter_lines(self):
+        """Строки текстового представления дерева (итеративно, без рекурсии)"""
+        first_child, next_sibling = self.sibling_links()
+
+        # (узел, префикс, уровень корня)
+        stack = [(first_child[self.ROOT], '', True)]
+        while stack:
+            node, prefix, is_root = stack.pop()
+            if node == -1:
+                continue
+
+            sibling = next_sibling[node]
+            is_last = sibling == -1
+            stack.append((sibling, prefix, is_root))
+
+            if is_root:
+                connector = ''
+                extension = ''
+            else:
+                connector = '└── ' if is_last else '├── '
+                extension = '    ' if is_last else '│   '
+
+            yield prefix + connector + self.name(node) + '\n'
+
+            child = first_child[node]
+            if child != -1:
+                stack.append((child, prefix + extension, False))
+
+    def to_dict(self):
+        """Вложенные словари {компонент: {...}} - прежний формат дерева"""
+        nodes = [{}]
+        for node in range(1, len(self.parent)):
+            children = {}
+            nodes.append(children)
+            nodes[self.parent[node]][self.name(node)] = children
+        return nodes[self.ROOT]
 
 
 class TreeBuilder:
-    
+
     @staticmethod
-    def build_tree_from_file(input_file, output_file):
-        """Строит дерево из файла с путями"""
-        
-        # Читаем файл
-        with open(input_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Собираем все уникальные пути
-        all_paths = []
-        
+    def parse_paths(lines):
+        """Потоково выдаёт все пути из строк дампа (с повторами)"""
         for line in lines:
             line = line.strip()
             if not line:
                 continue
-            
+
             # Разделяем строку на тип элемента и пути
             parts = line.split(' ', 1)
             if len(parts) > 1:
-                paths_str = parts[1]
-                
-                # Разделяем по ';' и берём самый длинный путь (он полный)
-                paths = [p.strip() for p in paths_str.split(';') if p.strip()]
-                
-                for p in paths:
-                    components = p.split()
-                    if components:
-                        all_paths.append(p)
-
-        
-        # Строим дерево
-        tree = {}
-        
-        for path in all_paths:
-            # Разбиваем путь на компоненты
-            components = [c.strip() for c in path.split() if c.strip()]
-            
-            if components:
-                TreeBuilder._add_to_tree(tree, components)
-        
-        # Создаём директорию если нужно
-        output_dir = os.path.dirname(output_file)
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-        
-        # Записываем дерево в файл
-        with open(output_file, 'w', encoding='utf-8') as f:
-            TreeBuilder._write_tree(tree, f)
-        
-        print(f"✅ Дерево сохранено: {output_file}")
-        
-        # Статистика
-        TreeBuilder._print_stats(tree)
-        
-        return tree
-    
+                for path in parts[1].split(';'):
+                    path = path.strip()
+                    if path:
+                        yield path
+
     @staticmethod
-    def _add_to_tree(tree, components):
-        """Добавляет путь в дерево"""
-        current = tree
-        
-        for comp in components:
-            if comp not in current:
-                current[comp] = {}
-            current = current[comp]
-    
+    def iter_paths(input_file):
+        """
+        Потоково выдаёт все пути из файла (с повторами)
+
+        Как и в SelectorExtractor, вход может быть директорией, glob-шаблоном или списком
+        """
+        for file_path in SelectorExtractor.expand_inputs(input_file):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                yield from TreeBuilder.parse_paths(f)
+
     @staticmethod
-    def _write_tree(node, file, prefix='', is_root=True):
-        """Рекурсивно записывает дерево в файл"""
-        
-        if not node:
-            return
-        
-        items = sorted(node.items())
-        
-        for i, (key, children) in enumerate(items):
-            is_last = (i == len(items) - 1)
-            
-            # Определяем символы для отрисовки
-            if is_root:
-                connector = ''
-                extension = ''
-            else:
-                connector = '└── ' if is_last else '├── '
-                extension = '    ' if is_last else '│   '
-            
-            # Пишем текущий узел
-            file.write(prefix + connector + key + '\n')
-            
-            # Рекурсивно пишем детей
-            if children:
-                new_prefix = prefix + extension
-                TreeBuilder._write_tree(children, file, new_prefix, False)
-    
+    def _collect(paths, memory_budget=None):
+        """
+        Дерево и уникальные пути (ExternalSort) за один проход
+
+        Сверх memory_budget уникальные пути уходят во временные файлы
+        """
+        trie = SelectorTrie()
+        unique_paths = ExternalSort(memory_budget, Config.SORT_TMP_DIR)
+        add = unique_paths.add
+
+        for path in paths:
+            # Повторный путь уже есть в дереве (после сброса на диск
+            # повтор добавится в дерево ещё раз - add_path это не меняет)
+            if add(path):
+                trie.add_path(path.split())
+
+        trie.finish()
+        return trie, unique_paths
+
     @staticmethod
-    def _print_stats(tree):
-        """Выводит статистику"""
-        def count_nodes(node):
-            count = len(node)
-            for child in node.values():
-                count += count_nodes(child)
-            return count
-        
-        total = count_nodes(tree)
-        roots = len(tree)
-        
-        print(f"📊 Узлов в дереве: {total}")
-        print(f"📊 Корневых элементов: {roots}")
-    
+    def build_from_lines(lines):
+        """Дерево и отсортированные уникальные пути из строк дампа (без файлов)"""
+        trie, unique_paths = TreeBuilder._collect(TreeBuilder.parse_paths(lines))
+        return trie, list(unique_paths)
+
+    @staticmethod
+    def build(input_file, tree_file=None, paths_file=None, memory_budget=None):
+        """
+        Один потоковый проход по файлу: строит дерево и собирает уникальные пути
+
+        Записывает дерево в tree_file и отсортированные пути в paths_file
+        (если они заданы). Возвращает (SelectorTrie, итератор отсортированных путей)
+
+        memory_budget (по умолчанию Config.PATHS_MEMORY_BUDGET) - байт на
+        уникальные пути в памяти. С ограничением пути не собираются в список:
+        итератор читает записанный paths_file или (без него) сливает прогоны
+        ExternalSort при обходе. Бюджет ограничивает только удаление повторов
+        путей - само дерево растёт с числом уникальных узлов
+        """
+        if memory_budget is None:
+            memory_budget = Config.PATHS_MEMORY_BUDGET
+
+        # Проход общий для дерева и путей - его время относится к 'tree'
+        with Metrics.span('tree'):
+            trie, unique_paths = TreeBuilder._collect(TreeBuilder.iter_paths(input_file), memory_budget)
+
+            if tree_file:
+                TreeBuilder._write_tree(trie, tree_file)
+
+        with Metrics.span('paths'):
+            paths, count = TreeBuilder._sorted_paths(unique_paths, paths_file, memory_budget)
+
+        if unique_paths.spilled:
+            Metrics.count('path_runs', unique_paths.spilled)
+        Metrics.count('nodes', len(trie))
+        if count is not None:
+            Metrics.count('paths', count)
+
+        return trie, paths
+
     @staticmethod
-    def extract_all_paths(input_file, output_file):
+    def build_tree_from_file(input_file, output_file):
+        """
+        Строит дерево из файла с путями
+
+        Возвращает вложенные словари {компонент: {...}}, как и раньше;
+        SelectorTrie без преобразования возвращает TreeBuilder.build
+        """
+        trie = SelectorTrie()
+        for path in TreeBuilder.iter_paths(input_file):
+            trie.add_path(path.split())
+        trie.finish()
+
+        TreeBuilder._write_tree(trie, output_file)
+        return trie.to_dict()
+
+    @staticmethod
+    def extract_all_paths(input_file, output_file, memory_budget=None):
         """
         Извлекает все уникальные пути из файла
         Пример: #roombox #header #logo;#header #logo;#logo
-        Результат: 
+        Результат:
             #roombox #header #logo
             #header #logo
             #logo
+
+        Записывает пути в output_file и, как TreeBuilder.build, возвращает
+        итератор отсортированных путей (с memory_budget - чтение output_file)
         """
-        
-        # Читаем файл
-        with open(input_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Собираем все уникальные пути
-        unique_paths = set()
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Разделяем строку на тип элемента и пути
-            parts = line.split(' ', 1)
-            if len(parts) > 1:
-                paths_str = parts[1]
-                
-                # Разделяем по ';' и добавляем каждый путь
-                for path in paths_str.split(';'):
-                    path = path.strip()
-                    if path:
-                        unique_paths.add(path)
-        
-        # Сортируем пути
-        sorted_paths = sorted(unique_paths)
-        
-        # Создаём директорию если нужно
+        if memory_budget is None:
+            memory_budget = Config.PATHS_MEMORY_BUDGET
+
+        unique_paths = ExternalSort(memory_budget, Config.SORT_TMP_DIR)
+        for path in TreeBuilder.iter_paths(input_file):
+            unique_paths.add(path)
+
+        return TreeBuilder._sorted_paths(unique_paths, output_file, memory_budget)[0]
+
+    @staticmethod
+    def _sorted_paths(unique_paths, paths_file, memory_budget):
+        """
+        Итератор отсортированных путей из ExternalSort и их количество (None, если неизвестно)
+
+        Без memory_budget пути собираются в список, иначе читаются из
+        записанного paths_file или (без него) сливаются при обходе
+        """
+        if memory_budget is None:
+            sorted_paths = list(unique_paths)
+            if paths_file:
+                TreeBuilder._write_paths(sorted_paths, paths_file)
+            return iter(sorted_paths), len(sorted_paths)
+        if paths_file:
+            count = TreeBuilder._write_paths(unique_paths, paths_file)
+            return TreeBuilder._read_paths(paths_file), count
+        # Прогоны сливаются при обходе, временные файлы удаляются после него
+        # (или при сборке мусора, если итератор не понадобился)
+        return iter(unique_paths), None
+
+    @staticmethod
+    def _make_dirs(output_file):
+        """Создаёт директорию для файла если нужно"""
         output_dir = os.path.dirname(output_file)
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
-        
-        # Записываем в файл
+
+    @staticmethod
+    def _write_tree(trie, output_file):
+        """Записывает дерево в файл и выводит статистику"""
+        TreeBuilder._make_dirs(output_file)
+
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.writelines(trie.iter_lines())
+
+        Metrics.log(f"✅ Дерево сохранено: {output_file}")
+
+        TreeBuilder._print_stats(trie)
+
+    @staticmethod
+    def _read_paths(paths_file):
+        """Поток путей из файла, записанного _write_paths"""
+        with open(paths_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield line[:-1]
+
+    @staticmethod
+    def _write_paths(sorted_paths, output_file):
+        """Записывает отсортированные пути (список или поток) в файл, возвращает их количество"""
+        TreeBuilder._make_dirs(output_file)
+
+        count = 0
         with open(output_file, 'w', encoding='utf-8') as f:
             for path in sorted_paths:
                 f.write(path + '\n')
-        
-        print(f"✅ Все пути сохранены: {output_file}")
-        print(f"📊 Уникальных путей: {len(sorted_paths)}")
-        
-        return sorted_paths
\ No newline at end of file
+                count += 1
+
+        Metrics.log(f"✅ Все пути сохранены: {output_file}")
+        Metrics.log(f"📊 Уникальных путей: {count}")
+        return count
+
+    @staticmethod
+    def _print_stats(trie):
+        """Выводит статистику"""
+        Metrics.log(f"📊 Узлов в дереве: {len(trie)}")
+        Metrics.log(f"📊 Корневых элементов: {trie.child_count[SelectorTrie.ROOT]}")
@@ -0,0 +1,172 @@
+"""
+Назначение цветов по дереву: различаются только соседние в иерархии селекторы
+"""
+import heapq
+
+from SelectorExtractor import SELECTOR_PATTERN
+from TreeBuilder import SelectorTrie
+
+PREFIXES = {'id': '#', 'class': '.'}
+
+
+class TreeColoring:
+    """
+    Раскраска графа конфликтов селекторов (DSATUR)
+
+    Ребро графа соединяет селекторы одного типа, которые на экране
+    могут оказаться рядом: элемент и ближайший предок с селектором
+    того же типа (промежуточные элементы другого типа этим CSS не
+    закрашиваются) и дети одного родителя. Дети виртуального корня
+    соседями не считаются: строка дампа перечисляет все суффиксы пути,
+    так что в корне оказывается каждый селектор. Остальные селекторы могут
+    получать один цвет, поэтому палитра - по числу цветов раскраски
+    (обычно порядка максимальной степени графа), а не по числу селекторов.
+    """
+
+    @staticmethod
+    def _component_selectors(trie, selector_type):
+        """Для каждого имени компонента - селекторы типа selector_type в нём"""
+        kind = PREFIXES[selector_type].encode('ascii')
+        return [
+            tuple(name.decode('ascii') for k, name in SELECTOR_PATTERN.findall(comp.encode('utf-8')) if k == kind)
+            for comp in trie.names
+        ]
+
+    @staticmethod
+    def conflict_graph(trie, selector_type):
+        """Граф конфликтов: {селектор: множество соседей} (селекторы без префикса)"""
+        by_name = TreeColoring._component_selectors(trie, selector_type)
+        size = len(trie.parent)
+        graph = {}
+
+        def connect(a_items, b_items):
+            for a in a_items:
+                neighbours = graph.setdefault(a, set())
+                for b in b_items:
+                    if a != b:
+                        neighbours.add(b)
+                        graph.setdefault(b, set()).add(a)
+
+        # Ближайший предок с селекторами нужного типа: узлы создаются после родителя,
+        # так что один проход по возрастанию индексов
+        holder = [SelectorTrie.ROOT] * size
+        children = {}
+        for node in range(1, size):
+            parent = trie.parent[node]
+            if parent != SelectorTrie.ROOT:
+                holder[node] = parent if by_name[trie.node_name[parent]] else holder[parent]
+
+            items = by_name[trie.node_name[node]]
+            if not items:
+                continue
+            for item in items:
+                graph.setdefault(item, set())
+            connect(items, items)
+            if holder[node] != SelectorTrie.ROOT:
+                connect(items, by_name[trie.node_name[holder[node]]])
+            if parent != SelectorTrie.ROOT:
+                children.setdefault(parent, set()).update(items)
+
+        # Дети одного родителя - попарно (кроме корня)
+        for items in children.values():
+            connect(items, items)
+
+        return graph
+
+    @staticmethod
+    def dsatur(graph, vertices=None):
+        """
+        Жадная раскраска DSATUR: {вершина: номер цвета}
+
+        Следующей красится вершина с наибольшим числом различных цветов
+        у соседей (при равенстве - с большей степенью, затем по имени),
+        ей достаётся наименьший свободный цвет. Результат детерминирован.
+        """
+        vertices = sorted(graph if vertices is None else vertices)
+        index = {v: i for i, v in enumerate(vertices)}
+        size = len(vertices)
+        adjacency = [[index[n] for n in graph.get(v, ()) if n in index] for v in vertices]
+        degree = [len(a) for a in adjacency]
+
+        # Приоритет (насыщенность, степень, имя) упакован в одно целое:
+        # сравнение чисел в куче намного дешевле сравнения кортежей
+        degree_base = max(degree, default=0) + 1
+
+        def key(i, saturation):
+            return -(saturation * degree_base + degree[i]) * size + i
+
+        color = [-1] * size
+        neighbour_colors = [set() for _ in range(size)]
+        heap = [key(i, 0) for i in range(size)]
+        heapq.heapify(heap)
+
+        while heap:
+            vertex = heapq.heappop(heap) % size
+            if color[vertex] != -1:
+                continue
+
+            used = neighbour_colors[vertex]
+            c = 0
+            while c in used:
+                c += 1
+            color[vertex] = c
+
+            for neighbour in adjacency[vertex]:
+                if color[neighbour] != -1:
+                    continue
+                seen = neighbour_colors[neighbour]
+                if c not in seen:
+                    seen.add(c)
+                    # Старые записи соседа в куче отбрасываются при извлечении
+                    heapq.heappush(heap, key(neighbour, len(seen)))
+
+        return dict(zip(vertices, color))
+
+    @staticmethod
+    def largest_first(graph, vertices=None):
+        """
+        Жадная раскраска по убыванию степени: {вершина: номер цвета}
+
+        Один проход по рёбрам - быстрее DSATUR на очень плотных графах,
+        цветов обычно столько же или немного больше
+        """
+        vertices = sorted(graph if vertices is None else vertices)
+        colors = {}
+        for vertex in sorted(vertices, key=lambda v: -len(graph.get(v, ()))):
+            used = {colors[n] for n in graph.get(vertex, ()) if n in colors}
+            c = 0
+            while c in used:
+                c += 1
+            colors[vertex] = c
+        return colors
+
+    STRATEGIES = {'dsatur': dsatur, 'greedy': largest_first}
+
+    @staticmethod
+    def assign(selectors, selector_type, trie, method, cache=None, strategy='dsatur'):
+        """
+        Цвета для selectors (в том же порядке) и размер палитры
+
+        strategy - 'dsatur' или 'greedy' (largest_first).
+        Палитра из числа цветов раскраски генерируется методом (или берётся из кэша)
+        """
+        if strategy not in TreeColoring.STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия раскраски '{strategy}'")
+        graph = TreeColoring.conflict_graph(trie, selector_type)
+        color_of = TreeColoring.STRATEGIES[strategy].__func__(graph, selectors)
+        size = max(color_of.values(), default=-1) + 1
+        if size == 0:
+            return [], 0
+
+        palette = cache.get_or_generate(method, size) if cache else method.generate(size)
+        palette = [tuple(int(c) for c in rgb) for rgb in palette]
+        return [palette[color_of[name]] for name in selectors], size
+
+    @staticmethod
+    def violations(colors, selectors, graph):
+        """Пары соседних селекторов с одинаковым цветом (для проверки)"""
+        color_of = dict(zip(selectors, colors))
+        return sorted(
+            (a, b) for a in graph for b in graph[a]
+            if a < b and a in color_of and b in color_of and color_of[a] == color_of[b]
+        )
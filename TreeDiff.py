@@ -0,0 +1,218 @@
+"""
+Структурное сравнение деревьев селекторов по хэшам поддеревьев
+
+Запуск:
+    python TreeDiff.py old.txt new.txt                  # дампы
+    python TreeDiff.py data/scb/old.scb new.txt         # старое дерево из бинарного экспорта
+    python TreeDiff.py old.txt new.txt --output diff.json
+"""
+import argparse
+import json
+import sys
+
+from SelectorExtractor import SELECTOR_PATTERN
+from TreeBuilder import SelectorTrie, TreeBuilder
+
+SELECTOR_TYPES = {b'#': 'id', b'.': 'class'}
+
+
+class TreeDiff:
+    """
+    Разница двух деревьев: добавленные, удалённые и перемещённые поддеревья
+    и появившиеся или исчезнувшие селекторы
+
+    Работает с SelectorTrie и BinaryReader (нужны индекс и хэши поддеревьев).
+    Обход идёт от корня параллельно по обоим деревьям: поддеревья
+    с одинаковым хэшем пропускаются целиком, поэтому время пропорционально
+    изменениям (пути к ним и их размеру), а не размеру деревьев.
+    Удалённое и добавленное поддеревья с одинаковым хэшем считаются перемещением.
+    """
+
+    @staticmethod
+    def _changed_subtrees(old, new):
+        """Корни удалённых (в old) и добавленных (в new) поддеревьев"""
+        added = []
+        removed = []
+        stack = [(SelectorTrie.ROOT, SelectorTrie.ROOT)]
+
+        while stack:
+            a, b = stack.pop()
+            if old.subtree_hash(a) == new.subtree_hash(b):
+                continue
+
+            old_children = {old.name(child): child for child in old.children(a)}
+            for child in new.children(b):
+                match = old_children.pop(new.name(child), None)
+                if match is None:
+                    added.append(child)
+                else:
+                    stack.append((match, child))
+            removed.extend(old_children.values())
+
+        return removed, added
+
+    @staticmethod
+    def _match(tree, roots, targets_by_hash, on_match):
+        """Обход поддеревьев roots сверху вниз до первого узла с хэшем из targets_by_hash"""
+        for root in roots:
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                candidates = targets_by_hash.get(tree.subtree_hash(node))
+                if candidates:
+                    on_match(candidates.pop(), node)
+                else:
+                    stack.extend(tree.children(node))
+
+    @staticmethod
+    def _moves(old, removed, new, added):
+        """
+        Перемещения: поддерево с тем же хэшем исчезло в одном месте и появилось в другом
+
+        Корни удалённых ветвей ищутся внутри добавленных (ветвь могла переехать
+        в новую), оставшиеся корни добавленных - внутри удалённых.
+        Возвращает (перемещения, сопоставленные удалённые, сопоставленные добавленные)
+        """
+        moved = []
+        moved_old = set()
+        moved_new = set()
+
+        def record(source, target):
+            moved_old.add(source)
+            moved_new.add(target)
+            moved.append({'from': old.path(source), 'to': new.path(target), 'size': new.subtree_size(target)})
+
+        removed_by_hash = {}
+        for node in removed:
+            removed_by_hash.setdefault(old.subtree_hash(node), []).append(node)
+        TreeDiff._match(new, added, removed_by_hash, record)
+
+        added_by_hash = {}
+        for node in added:
+            if node not in moved_new:
+                added_by_hash.setdefault(new.subtree_hash(node), []).append(node)
+        TreeDiff._match(old, [node for node in removed if node not in moved_old], added_by_hash,
+                        lambda target, source: record(source, target))
+        return moved, moved_old, moved_new
+
+    @staticmethod
+    def _subtree_names(tree, node):
+        """Имена компонентов поддерева"""
+        names = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            names.add(tree.name(node))
+            stack.extend(tree.children(node))
+        return names
+
+    @staticmethod
+    def _selectors(names):
+        """Селекторы из имён компонентов: {'id': [...], 'class': [...]}"""
+        result = {'id': set(), 'class': set()}
+        for name in names:
+            for kind, selector in SELECTOR_PATTERN.findall(name.encode('utf-8')):
+                result[SELECTOR_TYPES[kind]].add(selector.decode('ascii'))
+        return {selector_type: sorted(items) for selector_type, items in result.items()}
+
+    @staticmethod
+    def _branch(tree, node):
+        return {'path': tree.path(node), 'size': tree.subtree_size(node)}
+
+    @staticmethod
+    def diff(old, new):
+        """
+        Структурная разница old -> new:
+        {'unchanged', 'added', 'removed', 'moved', 'selectors': {'added', 'removed'}}
+
+        Ветви - {'path': [компоненты], 'size': узлов}, перемещения -
+        {'from': путь, 'to': путь, 'size': узлов}. Селектор считается
+        добавленным (удалённым), если его компонента нет в старом (новом) дереве.
+        """
+        removed, added = TreeDiff._changed_subtrees(old, new)
+
+        moved, moved_old, moved_new = TreeDiff._moves(old, removed, new, added)
+        still_added = [node for node in added if node not in moved_new]
+        still_removed = sorted(node for node in removed if node not in moved_old)
+
+        # Новые и исчезнувшие компоненты могут быть только в изменённых ветвях
+        added_names = set()
+        for node in still_added:
+            added_names |= TreeDiff._subtree_names(new, node)
+        removed_names = set()
+        for node in still_removed:
+            removed_names |= TreeDiff._subtree_names(old, node)
+
+        return {
+            'unchanged': old.subtree_hash(SelectorTrie.ROOT) == new.subtree_hash(SelectorTrie.ROOT),
+            'added': [TreeDiff._branch(new, node) for node in still_added],
+            'removed': [TreeDiff._branch(old, node) for node in still_removed],
+            'moved': moved,
+            'selectors': {
+                'added': TreeDiff._selectors(name for name in added_names if not old.find(name)),
+                'removed': TreeDiff._selectors(name for name in removed_names if not new.find(name)),
+            },
+        }
+
+    @staticmethod
+    def changed_types(report):
+        """Типы селекторов ('id', 'class'), у которых изменился набор - их CSS нужно перегенерировать"""
+        selectors = report['selectors']
+        return {selector_type for selector_type in SELECTOR_TYPES.values()
+                if selectors['added'][selector_type] or selectors['removed'][selector_type]}
+
+    @staticmethod
+    def load_tree(path):
+        """Дерево из дампа (SelectorTrie) или из бинарного экспорта *.scb (BinaryReader)"""
+        if path.endswith('.scb'):
+            # Импорт здесь: BinaryExport сам зависит от TreeBuilder
+            from BinaryExport import BinaryReader
+
+            reader = BinaryReader(path)
+            if not (reader.has_index and reader.has_hashes):
+                reader.close()
+                raise ValueError(f"В {path} нет индекса или хэшей дерева - экспорт старого формата")
+            return reader
+        return TreeBuilder.build(path)[0]
+
+    @staticmethod
+    def save(report, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Структурная разница деревьев селекторов')
+    parser.add_argument('old', help='старый дамп или *.scb')
+    parser.add_argument('new', help='новый дамп или *.scb')
+    parser.add_argument('--output', help='записать разницу в JSON')
+    args = parser.parse_args(argv)
+
+    old = TreeDiff.load_tree(args.old)
+    new = TreeDiff.load_tree(args.new)
+    report = TreeDiff.diff(old, new)
+    for tree in (old, new):
+        if hasattr(tree, 'close'):
+            tree.close()
+
+    if args.output:
+        TreeDiff.save(report, args.output)
+
+    if report['unchanged']:
+        print("✅ Деревья совпадают")
+        return 0
+
+    for title, key in (("➕ Добавлено", 'added'), ("➖ Удалено", 'removed')):
+        for branch in report[key]:
+            print(f"{title}: {' '.join(branch['path'])} ({branch['size']} узл.)")
+    for move in report['moved']:
+        print(f"🔀 Перемещено: {' '.join(move['from'])} → {' '.join(move['to'])} ({move['size']} узл.)")
+    for key, sign in (('added', '+'), ('removed', '-')):
+        for selector_type, prefix in (('id', '#'), ('class', '.')):
+            for name in report['selectors'][key][selector_type]:
+                print(f"   {sign}{prefix}{name}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Бенчмарки: методы генерации цветов, извлечение селекторов, дерево, CSS/HTML
+
+Запуск:
+    python benchmark.py                                  # всё с настройками по умолчанию
+    python benchmark.py --lines 1000 1000000 --depth 12  # размеры синтетических дампов
+    python benchmark.py --output bench.json              # сохранить результаты
+    python benchmark.py --compare baseline.json          # сравнить с сохранённым запуском
+    python benchmark.py --report --metric ciede2000      # качество палитр всех методов
+
+Результаты - JSON со временем (лучшее из --repeat) и пиковой памятью (tracemalloc).
+В режиме сравнения код возврата 1, если что-то замедлилось больше порога.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from config import METHODS
+from ColorDistance import ColorDistance
+from SelectorExtractor import SelectorExtractor
+from SelectorColorMapper import SelectorColorMapper
+from TreeBuilder import TreeBuilder
+
+# Сетка n и параметров для методов генерации
+DEFAULT_N = [10, 50, 100, 200]
+PARAM_GRID = {
+    'num_samples': [10000, 100000],
+    'sampling': ['random', 'sobol', 'stratified'],
+    'skip': [16, 8],
+}
+
+ELEMENT_TYPES = ['FrameLayout', 'LinearLayout', 'TextView', 'ImageView', 'DefaultUI', 'WelcomeView']
+
+
+class DumpGenerator:
+    """Синтетические дампы UI в формате data/example.txt"""
+
+    @staticmethod
+    def generate(path, lines, depth=8, ids=200, classes=20, seed=0):
+        """
+        Пишет дамп из lines строк: случайное блуждание по иерархии глубиной
+        до depth из ids ID- и classes class-селекторов. Пишет потоково,
+        так что подходит и для 10⁷ строк.
+        """
+        rnd = random.Random(seed)
+        id_names = [f'#view_{i}' for i in range(ids)]
+        class_names = [f'.cls_{i}' for i in range(classes)]
+
+        stack = []
+        with open(path, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+            for _ in range(lines):
+                # Спускаемся, поднимаемся или остаёмся на уровне
+                step = rnd.random()
+                if stack and (step < 0.3 or len(stack) >= depth):
+                    del stack[rnd.randint(1, len(stack)) - 1:]
+                if not stack or step > 0.5:
+                    if class_names and rnd.random() < 0.2:
+                        stack.append(rnd.choice(class_names))
+                    else:
+                        stack.append(rnd.choice(id_names))
+
+                paths = [' '.join(stack[i:]) for i in range(len(stack))]
+                f.write(f"{rnd.choice(ELEMENT_TYPES)} {';'.join(paths)}\n")
+
+
+def measure(func, repeat):
+    """Лучшее время из repeat запусков и пиковая память одного запуска"""
+    sink = io.StringIO()
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(sink):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            func()
+        best = min(best, time.perf_counter() - start)
+        sink.seek(0)
+        sink.truncate()
+
+    return best, peak
+
+
+def _param_variants(method):
+    """Все комбинации параметров метода из PARAM_GRID"""
+    variants = [dict(method.params)]
+    for name in method.params:
+        if name in PARAM_GRID:
+            variants = [dict(v, **{name: value}) for v in variants for value in PARAM_GRID[name]]
+    return variants
+
+
+def bench_methods(n_values, repeat, methods=None):
+    """Каждый метод из config.METHODS по сетке n и параметров"""
+    results = []
+    for key, method in METHODS.items():
+        if methods and key not in methods:
+            continue
+        for params in _param_variants(method):
+            for n in n_values:
+                try:
+                    seconds, peak = measure(lambda: method.func(n, **params), repeat)
+                except ValueError as e:
+                    print(f"   ⚠️ {key} n={n}: {e}")
+                    continue
+                results.append({'name': f'method.{key}', 'params': dict(params, n=n),
+                                'seconds': seconds, 'peak_bytes': peak})
+                print(f"   {key:<14} n={n:<5} {params} {seconds * 1000:9.2f} мс")
+    return results
+
+
+def bench_quality(n_values, metric, methods=None):
+    """Качество палитр каждого метода: минимальное и среднее ΔE до ближайшего соседа"""
+    results = []
+    sink = io.StringIO()
+    for key, method in METHODS.items():
+        if methods and key not in methods:
+            continue
+        for n in n_values:
+            try:
+                with contextlib.redirect_stdout(sink):
+                    colors = method.generate(n)
+            except ValueError as e:
+                print(f"   ⚠️ {key} n={n}: {e}")
+                continue
+            report = ColorDistance.palette_report(colors, metric)
+            results.append({'name': f'quality.{key}', 'params': dict(method.params, n=n), **report})
+            # Для палитры из одного цвета расстояний нет (None)
+            min_de, mean_nn = (f'{value:8.3f}' if value is not None else f'{"—":>8}' for value in (report['min'], report['mean_nn']))
+            print(f"   {key:<16} n={n:<5} min ΔE={min_de}  mean NN ΔE={mean_nn}")
+    return results
+
+
+def bench_pipeline(tmp_dir, sizes, depth, ids, classes, repeat):
+    """Извлечение, дерево и CSS/HTML на синтетических дампах разного размера"""
+    results = []
+    method = METHODS['simple']
+
+    for lines in sizes:
+        dump = os.path.join(tmp_dir, f'dump_{lines}.txt')
+        DumpGenerator.generate(dump, lines, depth, ids, classes)
+        params = {'lines': lines, 'depth': depth, 'ids': ids, 'classes': classes,
+                  'bytes': os.path.getsize(dump)}
+
+        found = {}
+
+        def extract():
+            found['ids'], found['classes'] = SelectorExtractor.extract(dump)
+
+        def tree():
+            TreeBuilder.build(dump, os.path.join(tmp_dir, 'tree.txt'), os.path.join(tmp_dir, 'all_paths.txt'))
+
+        def mapper():
+            SelectorColorMapper.generate(found['ids'], os.path.join(tmp_dir, 'ids.css'),
+                                         os.path.join(tmp_dir, 'ids.html'), 'id', method)
+
+        def end_to_end():
+            extract()
+            mapper()
+            tree()
+
+        for name, func in (('extract', extract), ('tree', tree), ('mapper', mapper), ('end_to_end', end_to_end)):
+            seconds, peak = measure(func, repeat)
+            results.append({'name': f'pipeline.{name}', 'params': params,
+                            'seconds': seconds, 'peak_bytes': peak})
+            print(f"   {name:<12} lines={lines:<9} {seconds * 1000:9.2f} мс  {peak / 1024 / 1024:7.1f} МБ")
+
+    return results
+
+
+def _result_key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(results, baseline_file, threshold):
+    """Сравнение с сохранённым запуском, возвращает список регрессий"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {_result_key(r): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        base = baseline.get(_result_key(result))
+        # Сравниваем только замеры времени (у оценок качества его нет)
+        if not base or 'seconds' not in result or base.get('seconds', 0) <= 0:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        mark = '❌' if ratio > 1 + threshold else '✅'
+        print(f"{mark} {result['name']:<22} {result['params']} x{ratio:.2f}")
+        if ratio > 1 + threshold:
+            regressions.append({'name': result['name'], 'params': result['params'], 'ratio': ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарки ScreenColorizer')
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 100000],
+                        help='размеры синтетических дампов в строках')
+    parser.add_argument('--depth', type=int, default=8, help='максимальная глубина иерархии')
+    parser.add_argument('--ids', type=int, default=200, help='количество различных ID')
+    parser.add_argument('--classes', type=int, default=20, help='количество различных классов')
+    parser.add_argument('--n', type=int, nargs='+', default=DEFAULT_N, help='размеры палитр')
+    parser.add_argument('--methods', nargs='+', help='только эти методы из config.METHODS')
+    parser.add_argument('--repeat', type=int, default=3, help='повторов на замер')
+    parser.add_argument('--skip-methods', action='store_true', help='не замерять методы генерации')
+    parser.add_argument('--skip-pipeline', action='store_true', help='не замерять извлечение/дерево/CSS')
+    parser.add_argument('--report', action='store_true', help='оценить качество палитр всех методов')
+    parser.add_argument('--metric', default='ciede2000', choices=sorted(ColorDistance.METRICS),
+                        help='метрика для --report')
+    parser.add_argument('--output', help='записать результаты в JSON')
+    parser.add_argument('--compare', help='JSON прошлого запуска для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.2, help='допустимое замедление (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    results = []
+    if not args.skip_methods:
+        print("🎨 Методы генерации цветов")
+        results += bench_methods(args.n, args.repeat, args.methods)
+    if args.report:
+        print(f"📏 Качество палитр ({args.metric})")
+        results += bench_quality(args.n, args.metric, args.methods)
+    if not args.skip_pipeline:
+        print("📋 Извлечение / дерево / CSS+HTML")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results += bench_pipeline(tmp_dir, args.lines, args.depth, args.ids, args.classes, args.repeat)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 Результаты: {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"❌ Регрессий: {len(regressions)}")
+            return 1
+        print("✅ Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Потоковый режим: дампы из stdin, результаты в stdout
+
+Запуск:
+    capture | python cli.py                          # CSS для каждого дампа
+    capture | python cli.py --format tree            # дерево селекторов
+    capture | python cli.py --format jsonl | consumer
+    python cli.py --format paths < data/example.txt
+
+Дампы (записи) разделяются пустой строкой, каждая обрабатывается, как
+только дочитана до конца. Результаты записей в текстовых форматах тоже
+разделяются пустой строкой, в jsonl - по одной строке JSON на запись.
+Временных файлов нет. Запись читается только после того, как результат
+предыдущей записан и сброшен в stdout, поэтому медленный потребитель
+через заполненный буфер канала тормозит и производителя.
+"""
+import argparse
+import json
+import os
+import sys
+
+from config import Config, METHODS
+from Metrics import Metrics
+from PaletteCache import PaletteCache
+from SelectorExtractor import SelectorExtractor
+from SelectorColorMapper import SelectorColorMapper
+from TreeBuilder import TreeBuilder
+
+FORMATS = ('css', 'paths', 'tree', 'selectors', 'jsonl')
+
+
+def iter_records(stream):
+    """Записи из бинарного потока: списки строк (bytes) между пустыми строками"""
+    record = []
+    for line in iter(stream.readline, b''):
+        if line.strip():
+            record.append(line)
+        elif record:
+            yield record
+            record = []
+    if record:
+        yield record
+
+
+class StreamProcessor:
+    """Преобразование одной записи дампа в текст выбранного формата"""
+
+    def __init__(self, output_format, method, cache=None):
+        self.format = output_format
+        self.method = method
+        self.cache = cache
+        self.palettes = {}  # n -> палитра, чтобы не генерировать её на каждую запись
+
+    def _palette(self, n):
+        palette = self.palettes.get(n)
+        if palette is None:
+            with Metrics.span('palette'):
+                if self.cache:
+                    palette = self.cache.get_or_generate(self.method, n)
+                else:
+                    palette = self.method.generate(n)
+            self.palettes[n] = palette
+        return palette
+
+    def _selectors(self, record):
+        with Metrics.span('extract'):
+            ids, classes = SelectorExtractor.extract_bytes(b''.join(record))
+        Metrics.count('selectors', len(ids) + len(classes))
+        return ids, classes
+
+    def _tree(self, record):
+        with Metrics.span('tree'):
+            trie, paths = TreeBuilder.build_from_lines(line.decode('utf-8') for line in record)
+        Metrics.count('nodes', len(trie))
+        Metrics.count('paths', len(paths))
+        return trie, paths
+
+    def render(self, number, record):
+        """Результат записи: итератор строк текста"""
+        if self.format == 'tree':
+            trie, _ = self._tree(record)
+            return trie.iter_lines()
+
+        if self.format == 'paths':
+            _, paths = self._tree(record)
+            return (path + '\n' for path in paths)
+
+        ids, classes = self._selectors(record)
+
+        if self.format == 'selectors':
+            return [f'#{name}\n' for name in ids] + [f'.{name}\n' for name in classes]
+
+        groups = [(selector_type, selectors, self._palette(len(selectors)))
+                  for selector_type, selectors in (('id', ids), ('class', classes)) if selectors]
+
+        if self.format == 'jsonl':
+            _, paths = self._tree(record)
+            result = {'record': number, 'ids': {}, 'classes': {}, 'paths': paths}
+            for selector_type, selectors, colors in groups:
+                key = 'ids' if selector_type == 'id' else 'classes'
+                result[key] = {name: [int(c) for c in rgb] for name, rgb in zip(selectors, colors)}
+            return [json.dumps(result, ensure_ascii=False) + '\n']
+
+        with Metrics.span('css_html'):
+            lines = [SelectorColorMapper.css_header(self.method)]
+            for selector_type, selectors, colors in groups:
+                prefix = SelectorColorMapper._prefix(selector_type)
+                lines.extend(SelectorColorMapper.css_block(prefix, name, rgb)
+                             for name, rgb in zip(selectors, colors))
+        return lines
+
+
+def run(stdin, stdout, processor):
+    """Обработка записей по мере поступления; возвращает количество записей"""
+    count = 0
+    for number, record in enumerate(iter_records(stdin)):
+        chunks = processor.render(number, record)
+        if count and processor.format != 'jsonl':
+            stdout.write(b'\n')
+        stdout.write(''.join(chunks).encode('utf-8'))
+        # Сбрасываем сразу: потребитель получает результат записи целиком
+        stdout.flush()
+        count += 1
+        Metrics.count('records')
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ScreenColorizer: дампы из stdin, результаты в stdout')
+    parser.add_argument('--format', '-f', choices=FORMATS, default='css', help='формат вывода')
+    parser.add_argument('--method', '-m', default=Config.COLOR_METHOD, choices=sorted(METHODS),
+                        help='метод генерации цветов')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать дисковый кэш палитр')
+    parser.add_argument('--verbose', '-v', action='store_true', help='сообщения о ходе работы в stderr')
+    args = parser.parse_args(argv)
+
+    # stdout занят результатами - сообщения уходят в stderr
+    Config.VERBOSE = args.verbose
+    if args.verbose:
+        sys.stdout = sys.stderr
+
+    cache = None
+    if Config.CACHE_ENABLED and not args.no_cache:
+        cache = PaletteCache(Config.CACHE_DIR, Config.CACHE_MAX_BYTES)
+    processor = StreamProcessor(args.format, METHODS[args.method], cache)
+
+    stdout = sys.__stdout__.buffer
+    try:
+        count = run(sys.stdin.buffer, stdout, processor)
+    except BrokenPipeError:
+        # Потребитель закрыл канал (например, head) - молча выходим,
+        # а stdout перенаправляем, чтобы при выходе не было второй ошибки
+        os.dup2(os.open(os.devnull, os.O_WRONLY), stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+    Metrics.log(f"✅ Обработано записей: {count}")
+    Metrics.export()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,42 +1,101 @@
 """
 Конфигурация проекта
 """
-from ColorGenerator import ColorGenerator
+import importlib
 
 
 class ColorMethod:
-    """Описание метода генерации цветов"""
+    """
+    Описание метода генерации цветов
+
+    Функция задаётся строкой 'Модуль.Класс.метод' и импортируется
+    только при первом обращении к func, поэтому импорт config
+    не тянет numpy/matplotlib.
+    """
     
-    def __init__(self, func, description):
-        self.func = func
+    def __init__(self, func_path, description, params=None, extend_path=None):
+        self.func_path = func_path
         self.description = description
+        self.params = params or {}
+        self.extend_path = extend_path
+        self._func = None
+        self._extend_func = None
+
+    @property
+    def module_name(self):
+        return self.func_path.split('.', 1)[0]
+
+    @staticmethod
+    def _resolve(path):
+        module_name, *attrs = path.split('.')
+        func = importlib.import_module(module_name)
+        for attr in attrs:
+            func = getattr(func, attr)
+        return func
+
+    @property
+    def func(self):
+        """Функция генерации (импортируется лениво)"""
+        if self._func is None:
+            self._func = self._resolve(self.func_path)
+        return self._func
+
+    @property
+    def can_extend(self):
+        """Умеет ли метод дополнять уже выбранную палитру"""
+        return self.extend_path is not None
+
+    def __getstate__(self):
+        # Для пула процессов передаём только строковое описание
+        state = self.__dict__.copy()
+        state['_func'] = None
+        state['_extend_func'] = None
+        return state
+
+    def generate(self, n):
+        """Сгенерировать палитру из n цветов с параметрами метода"""
+        return self.func(n, **self.params)
+
+    def extend(self, existing, n):
+        """Сгенерировать n цветов, максимально отличных от existing"""
+        if self._extend_func is None:
+            self._extend_func = self._resolve(self.extend_path)
+        return self._extend_func(existing, n, **self.params)
 
 
 # Доступные методы генерации цветов
 METHODS = {
     'fps_oklab': ColorMethod(
-        ColorGenerator.generate_fps_oklab_colors,
-        'Farthest-Point Sampling в OKLab - максимальная визуальная различимость'
+        'ColorGenerator.ColorGenerator.generate_fps_oklab_colors',
+        'Farthest-Point Sampling в OKLab - максимальная визуальная различимость',
+        {'num_samples': 8192, 'seed': 0, 'sampling': 'sobol'},
+        'ColorGenerator.ColorGenerator.extend_fps_oklab_colors'
+    ),
+    'fps_oklab_large': ColorMethod(
+        'ColorGenerator.ColorGenerator.generate_large_fps_oklab_colors',
+        'Сеточный Farthest-Point Sampling в OKLab - для сотен и тысяч селекторов',
+        {'num_samples': 262144, 'seed': 0, 'sampling': 'sobol'}
     ),
     'simple': ColorMethod(
-        ColorGenerator.generate_colors,
+        'ColorGenerator.ColorGenerator.generate_colors',
         'Простое равномерное распределение по цветовому кругу'
     ),
     'even': ColorMethod(
-        ColorGenerator.generate_colors_even,
+        'ColorGenerator.ColorGenerator.generate_colors_even',
         'Равномерное распределение - первая половина яркая, вторая тёмная'
     ),
     'golden': ColorMethod(
-        ColorGenerator.generate_golden_colors,
+        'ColorGenerator.ColorGenerator.generate_golden_colors',
         'Использование золотого угла для естественного распределения'
     ),
     'matplotlib': ColorMethod(
-        ColorGenerator.generate_matplotlib_colors,
+        'ColorGenerator.ColorGenerator.generate_matplotlib_colors',
         'Готовая палитра Matplotlib tab20'
     ),
     'lab_distinct': ColorMethod(
-        ColorGenerator.generate_distinct_lab_colors,
-        'Максимально различимые цвета в CIE Lab пространстве'
+        'ColorGenerator.ColorGenerator.generate_distinct_lab_colors',
+        'Максимально различимые цвета в CIE Lab пространстве',
+        {'skip': 16}
     ),
 }
 
@@ -51,10 +110,74 @@ class Config:
     # Метод генерации цветов (ключ из METHODS)
     COLOR_METHOD = 'fps_oklab'
     
-    # Пути
+    # Назначение цветов: 'global' - все селекторы различны (палитра по числу селекторов),
+    # 'tree' - различны только соседние в дереве (TreeColoring, палитра намного меньше)
+    ASSIGNMENT = 'global'
+    TREE_COLORING = 'dsatur'  # 'dsatur' или 'greedy' (быстрее на очень плотных графах)
+
+    # Пути (INPUT_FILE - файл, директория, glob-шаблон или список)
     INPUT_FILE = 'data/example.txt'
     OUTPUT_DIR = 'data'
+
+    # Сжимать CSS/HTML в gzip (*.css.gz, *.html.gz)
+    COMPRESS_OUTPUT = False
+
+    # Память на уникальные пути all_paths (байт): сверх неё - внешняя сортировка
+    # во временных файлах SORT_TMP_DIR (None - системная временная директория).
+    # None - всё в памяти
+    PATHS_MEMORY_BUDGET = None
+    SORT_TMP_DIR = None
+
+    # HTML-превью: 'full' - карточка на каждый селектор, 'virtual' - страница-оболочка
+    # и JS-чанки данных (HtmlPreview: рисуются только видимые карточки, есть поиск),
+    # 'auto' - virtual начиная с HTML_PREVIEW_THRESHOLD селекторов
+    HTML_PREVIEW = 'auto'
+    HTML_PREVIEW_THRESHOLD = 2000
+
+    # Бинарный экспорт селекторов, цветов и дерева (*.scb, читается BinaryReader через mmap)
+    BINARY_EXPORT = True
+
+    # Кэш палитр
+    CACHE_ENABLED = True
+    CACHE_DIR = 'data/cache'
+    CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+    # Инкрементальный режим: цвета селекторов сохраняются между запусками
+    INCREMENTAL = False
+    STATE_FILE = 'data/colors_state.json'
+
+    # Пакетный режим (SelectorProcessor.process_batch)
+    BATCH_OUTPUT_DIR = 'data/batch'
+    BATCH_WORKERS = None  # None - по числу ядер
+
+    # Резидентный сервис (ColorizerDaemon.py): Unix-сокет или localhost TCP
+    DAEMON_SOCKET = 'data/colorizer.sock'
+    DAEMON_HOST = '127.0.0.1'
+    DAEMON_WORKERS = 2                          # процессов для генерации палитр
+    DAEMON_MAX_CONCURRENT = 8                   # одновременно обрабатываемых запросов
+    DAEMON_MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+    # Бюджет на импорт main (проверка: python startup_check.py)
+    STARTUP_BUDGET_MS = 100
+
+    # Сообщения о ходе работы (по умолчанию тихий режим)
+    VERBOSE = False
+
+    # Метрики этапов (Metrics): замеры, счётчики, пиковая память
+    METRICS_ENABLED = False
+    METRICS_TRACE_MEMORY = False  # tracemalloc точнее RSS, но замедляет работу
+    METRICS_FILE = None           # 'data/metrics.json' или 'data/metrics.prom'
     
+    @classmethod
+    def validate(cls):
+        """Проверка сочетаний настроек (ValueError при ошибке)"""
+        if cls.ASSIGNMENT not in ('global', 'tree'):
+            raise ValueError(f"Неизвестный режим назначения цветов '{cls.ASSIGNMENT}'")
+        # Раскраска дерева не хранит состояние - цвета между запусками не сохранились бы
+        if cls.ASSIGNMENT == 'tree' and cls.INCREMENTAL:
+            raise ValueError("Режим ASSIGNMENT = 'tree' не совмещается с INCREMENTAL")
+        cls.get_method()
+
     @classmethod
     def get_method(cls):
         """Получить выбранный метод"""
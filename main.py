@@ -4,11 +4,13 @@
 """
 from SelectorProcessor import SelectorProcessor
 from TreeBuilder import TreeBuilder
+from Metrics import Metrics
 
 if __name__ == "__main__":
    #SelectorProcessor().process()
+   #SelectorProcessor().process_batch('data/dumps')
     input_file = 'data/example.txt'  # Путь к входному файлу
     output_dir_tree = 'data/tree.txt'
     output_dir_all = 'data/all_paths.txt'
-    TreeBuilder.build_tree_from_file(input_file, output_dir_tree)
-    TreeBuilder.extract_all_paths(input_file, output_dir_all)
\ No newline at end of file
+    TreeBuilder.build(input_file, output_dir_tree, output_dir_all)
+    Metrics.export()
\ No newline at end of file
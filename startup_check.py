@@ -0,0 +1,50 @@
+"""
+Проверка времени запуска через python -X importtime
+
+Запуск: python startup_check.py [модуль ...]
+По умолчанию проверяется main. Код возврата 1, если суммарный импорт
+дольше Config.STARTUP_BUDGET_MS или подтянуты тяжёлые зависимости.
+"""
+import subprocess
+import sys
+
+from config import Config
+
+HEAVY_MODULES = ('numpy', 'matplotlib')
+
+
+def measure_imports(module):
+    """Возвращает {модуль: cumulative мкс} для верхнего уровня импорта module"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def check(module):
+    """Проверяет один модуль и печатает отчёт, возвращает True если уложились"""
+    timings = measure_imports(module)
+    total_ms = timings.get(module, 0) / 1000
+    heavy = sorted(name for name in timings if name.split('.')[0] in HEAVY_MODULES)
+
+    ok = total_ms <= Config.STARTUP_BUDGET_MS and not heavy
+    status = '✅' if ok else '❌'
+    print(f"{status} import {module}: {total_ms:.1f} мс (бюджет {Config.STARTUP_BUDGET_MS} мс)")
+    if heavy:
+        print(f"   тяжёлые зависимости: {', '.join(heavy[:5])}")
+    return ok
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or ['main']
+    results = [check(m) for m in modules]
+    sys.exit(0 if all(results) else 1)